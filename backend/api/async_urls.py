@@ -0,0 +1,15 @@
+from django.urls import path
+
+from api import async_views
+
+# Подключаются перед маршрутами роутера в api.urls при ASYNC_READ_API
+urlpatterns = [
+    path('recipes/', async_views.recipe_list),
+    path('recipes/download_shopping_cart/',
+         async_views.download_shopping_cart),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('tags/', async_views.tag_list),
+    path('tags/<int:pk>/', async_views.tag_detail),
+    path('ingredients/', async_views.ingredient_list),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail),
+]
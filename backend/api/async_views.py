@@ -0,0 +1,77 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def offload(func):
+    """Выполняет синхронную функцию в пуле потоков, а не в общем
+    «потокобезопасном» потоке ASGI-обработчика.
+
+    Соединение с БД, открытое в рабочем потоке, закрывается по
+    правилам CONN_MAX_AGE, как после обычного запроса.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+def _render_view(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+
+    return wrapper
+
+
+def read_only_async(view):
+    """Асинхронная обёртка над DRF-представлением.
+
+    Безопасные запросы обрабатываются параллельно в пуле потоков,
+    остальные идут прежним синхронным путём.
+    """
+    read = offload(_render_view(view))
+    write = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
+
+
+recipe_list = read_only_async(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+)
+recipe_detail = read_only_async(
+    RecipeViewSet.as_view({
+        'get': 'retrieve',
+        'patch': 'partial_update',
+        'delete': 'destroy'
+    })
+)
+download_shopping_cart = read_only_async(
+    RecipeViewSet.as_view({'get': 'download_shopping_cart'})
+)
+# Списки тегов и ингредиентов идут через те же представления, что и
+# в WSGI: с ограничением частоты, поиском и кэшем списков
+tag_list = read_only_async(TagViewSet.as_view({'get': 'list'}))
+tag_detail = read_only_async(TagViewSet.as_view({'get': 'retrieve'}))
+ingredient_list = read_only_async(IngredientViewSet.as_view({'get': 'list'}))
+ingredient_detail = read_only_async(
+    IngredientViewSet.as_view({'get': 'retrieve'})
+)
@@ -0,0 +1,132 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import Change, IngredientInRecipe, Recipe, TagInRecipe
+from users.models import User
+
+
+def _viewer_version(user, **filters):
+    """Время последнего изменения избранного, списка покупок или
+    подписок пользователя."""
+    if not user.is_authenticated:
+        return None
+    return Subquery(
+        Change.objects.filter(user=user, **filters)
+        .order_by('-id').values('created_at')[:1]
+    )
+
+
+def _latest_related(model, field):
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(latest=Max(field)).values('latest')
+    )
+
+
+def _validators(state, timestamps):
+    digest = hashlib.md5(repr(state).encode()).hexdigest()
+    last_modified = max(
+        (timestamp for timestamp in timestamps if timestamp), default=None
+    )
+    return (
+        quote_etag(digest),
+        last_modified and int(last_modified.timestamp())
+    )
+
+
+def recipe_validators(recipe_id, request):
+    """ETag и Last-Modified рецепта одним запросом, без сериализации.
+
+    Учитывают сам рецепт, его ингредиенты и теги, автора и состояние
+    списков текущего пользователя. None, если рецепта нет.
+    """
+    user = request.user
+    try:
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        return None
+    annotations = {
+        'ingredients_updated': _latest_related(
+            IngredientInRecipe, 'ingredient__updated_at'
+        ),
+        'tags_updated': _latest_related(TagInRecipe, 'tag__updated_at'),
+    }
+    viewer_version = _viewer_version(user)
+    if viewer_version is not None:
+        annotations['viewer_updated'] = viewer_version
+    state = Recipe.objects.filter(pk=recipe_id).annotate(
+        **annotations
+    ).values(
+        'updated_at',
+        'author__username',
+        'author__email',
+        'author__first_name',
+        'author__last_name',
+        *annotations
+    ).first()
+    if state is None:
+        return None
+
+    return _validators(
+        (user.pk, sorted(state.items()),
+         sorted(request.query_params.lists())),
+        (state['updated_at'], state['ingredients_updated'],
+         state['tags_updated'], state.get('viewer_updated'))
+    )
+
+
+def subscriptions_validators(request):
+    """ETag и Last-Modified страницы подписок: подписки пользователя,
+    профили авторов, на которых он подписан, и их рецепты.
+
+    У пользователей нет времени изменения, поэтому профили авторов
+    входят только в ETag.
+    """
+    user = request.user
+    authors = list(User.objects.filter(following__user=user).order_by(
+        'pk'
+    ).values_list('pk', 'username', 'email', 'first_name', 'last_name'))
+    state = Recipe.objects.filter(author__following__user=user).aggregate(
+        recipes_updated=Max('updated_at'),
+        recipes_count=Count('pk')
+    )
+    subscriptions_updated = Change.objects.filter(
+        user=user,
+        kind=Change.SUBSCRIPTION
+    ).aggregate(latest=Max('created_at'))['latest']
+
+    return _validators(
+        (user.pk, sorted(state.items()), subscriptions_updated, authors,
+         sorted(request.query_params.lists())),
+        (state['recipes_updated'], subscriptions_updated)
+    )
+
+
+def conditional_response(request, validators, build_response):
+    """Отвечает 304, если клиентская копия актуальна, иначе строит
+    ответ и проставляет ему валидаторы."""
+    if validators is None:
+        return build_response()
+
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified
+    )
+    if response is None:
+        response = build_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
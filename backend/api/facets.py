@@ -0,0 +1,104 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+
+from foodgram.caching import cached, get_version
+from recipes.models import TagInRecipe
+
+USER_DEPENDENT_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+NON_FILTER_PARAMS = ('page', 'limit', 'facets')
+
+
+def _bucket_label(lower, upper):
+    if upper is None:
+        return f'{lower}+'
+    return f'{lower}-{upper}'
+
+
+def _tags_facet(queryset):
+    return TagInRecipe.objects.filter(
+        recipe__in=queryset.order_by().values('pk')
+    ).annotate(
+        facet=Value('tags', output_field=CharField()),
+        key=F('tag__slug')
+    ).values('facet', 'key').annotate(count=Count('recipe')).order_by()
+
+
+def _author_facet(queryset):
+    return queryset.order_by().annotate(
+        facet=Value('author', output_field=CharField()),
+        key=Cast('author', CharField())
+    ).values('facet', 'key').annotate(count=Count('pk')).order_by()
+
+
+def _cooking_time_facet(queryset):
+    bucket = Case(
+        *(When(cooking_time__lt=upper,
+               then=Value(_bucket_label(lower, upper)))
+          for lower, upper in settings.COOKING_TIME_BUCKETS
+          if upper is not None),
+        default=Value(_bucket_label(*settings.COOKING_TIME_BUCKETS[-1])),
+        output_field=CharField()
+    )
+    return queryset.order_by().annotate(
+        facet=Value('cooking_time', output_field=CharField()),
+        key=bucket
+    ).values('facet', 'key').annotate(count=Count('pk')).order_by()
+
+
+FACETS = {
+    'tags': _tags_facet,
+    'author': _author_facet,
+    'cooking_time': _cooking_time_facet,
+}
+
+
+def parse_facets(value):
+    names = list(dict.fromkeys(name for name in value.split(',') if name))
+    unknown = set(names) - FACETS.keys()
+    if unknown:
+        raise ValidationError({'facets': [
+            f'Неизвестные фасеты: {", ".join(sorted(unknown))}. '
+            f'Допустимые: {", ".join(FACETS)}'
+        ]})
+    return names
+
+
+def _cache_key(request, names):
+    params = sorted(
+        (key, sorted(request.query_params.getlist(key)))
+        for key in request.query_params
+        if key not in NON_FILTER_PARAMS
+    )
+    signature = repr((names, params))
+    if any(key in request.query_params for key in USER_DEPENDENT_PARAMS):
+        signature += f'|{request.user.pk}'
+    digest = hashlib.md5(signature.encode()).hexdigest()
+    # Версия списка рецептов меняется при любом изменении рецептов,
+    # тегов и ингредиентов (recipes.signals)
+    return f'recipe_facets:{get_version("recipe_list")}:{digest}'
+
+
+def get_facets(queryset, names, request):
+    """Количество рецептов в выдаче по каждому значению фасетов.
+
+    Все фасеты считаются одним запросом UNION ALL из группировок
+    и кэшируются по набору параметров фильтра до изменения рецептов.
+    """
+    def compute():
+        facets = {name: {} for name in names}
+        grouped = [FACETS[name](queryset) for name in names]
+        combined = grouped[0].union(*grouped[1:], all=True)
+        for row in combined:
+            facets[row['facet']][row['key']] = row['count']
+        return facets
+
+    return cached(
+        _cache_key(request, names),
+        compute,
+        settings.FACETS_CACHE_TIMEOUT,
+        name='facets'
+    )
@@ -1,6 +1,27 @@
+from django import forms
+from django.core.validators import validate_slug
 from django_filters.rest_framework import FilterSet, filters
+from django_filters.widgets import QueryArrayWidget
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, TagInRecipe
+
+
+class SlugListField(forms.Field):
+    """Список slug из повторяющегося параметра запроса."""
+
+    widget = QueryArrayWidget
+
+    def to_python(self, value):
+        return list(dict.fromkeys(slug for slug in value or () if slug))
+
+    def validate(self, value):
+        super().validate(value)
+        for slug in value:
+            validate_slug(slug)
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
 
 
 class IngredientFilter(FilterSet):
@@ -12,15 +33,39 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(queryset=Tag.objects.all(),
-                                             field_name='tags__slug',
-                                             to_field_name='slug')
+    POPULAR_ORDERING = ('-favorites_count', '-in_cart_count', '-pub_date')
+
+    tags = SlugListFilter(method='get_tags')
+    tags_mode = filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='get_tags_mode'
+    )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='get_ordering'
+    )
+
+    def get_tags(self, queryset, name, value):
+        """Полусоединение с таблицей тегов рецепта: рецепт попадает
+        в выдачу один раз, сколько бы его тегов ни совпало."""
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            for slug in value:
+                queryset = queryset.filter(pk__in=TagInRecipe.objects.filter(
+                    tag__slug=slug
+                ).values('recipe'))
+            return queryset
+        return queryset.filter(pk__in=TagInRecipe.objects.filter(
+            tag__slug__in=value
+        ).values('recipe'))
+
+    def get_tags_mode(self, queryset, name, value):
+        return queryset
 
     def get_is_favorited(self, queryset, name, value):
         if value:
@@ -32,6 +77,18 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset
 
+    def get_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by(*self.POPULAR_ORDERING)
+        return queryset
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'is_favorited', 'is_in_shopping_cart', 'author')
+        fields = (
+            'tags',
+            'tags_mode',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'author',
+            'ordering'
+        )
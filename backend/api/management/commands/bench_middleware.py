@@ -0,0 +1,75 @@
+import timeit
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+DJANGO_DEFAULT_MIDDLEWARE = (
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+
+@csrf_exempt
+def _empty_view(request):
+    return HttpResponse()
+
+
+def _build_chain(middleware):
+    def handler(request):
+        for middleware_instance in view_middleware:
+            response = middleware_instance(request, _empty_view, (), {})
+            if response is not None:
+                return response
+        return _empty_view(request)
+
+    view_middleware = []
+    chain = handler
+    for path in reversed(middleware):
+        # Как обработчик Django: выключенные middleware пропускаются
+        try:
+            instance = import_string(path)(chain)
+        except MiddlewareNotUsed:
+            continue
+        if hasattr(instance, 'process_view'):
+            view_middleware.insert(0, instance.process_view)
+        chain = instance
+    return chain
+
+
+class Command(BaseCommand):
+    help = 'Накладные расходы цепочки middleware на один запрос'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000,
+                            help='Количество запросов на замер')
+        parser.add_argument('--path',
+                            action='append',
+                            dest='paths',
+                            help='Путь запроса, можно указать несколько раз')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        number = options['number']
+        chains = {
+            'стандартная': _build_chain(DJANGO_DEFAULT_MIDDLEWARE),
+            'текущая': _build_chain(settings.MIDDLEWARE),
+        }
+
+        for path in options['paths'] or ('/api/recipes/', '/admin/'):
+            request = factory.get(path)
+            for name, chain in chains.items():
+                elapsed = timeit.timeit(lambda: chain(request), number=number)
+                self.stdout.write(
+                    f'{path} [{name}]: '
+                    f'{elapsed / number * 1_000_000:.1f} мкс/запрос'
+                )
@@ -0,0 +1,90 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, Tag, TagInRecipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнение фильтрации рецептов по тегам через JOIN '
+            'и через полусоединение на синтетических данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100_000,
+                            help='Количество синтетических рецептов')
+        parser.add_argument('--tags', type=int, default=10,
+                            help='Количество синтетических тегов')
+        parser.add_argument('--number', type=int, default=20,
+                            help='Повторов каждого замера')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            slugs = self._create_dataset(options['recipes'], options['tags'])
+            self._run(slugs[:2], options['number'])
+            self._run(slugs[:3], options['number'])
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _create_dataset(recipes_count, tags_count):
+        random.seed(0)
+        author = User.objects.create(
+            email='bench@example.com',
+            username='bench_tag_filter',
+            first_name='bench',
+            last_name='bench'
+        )
+        Tag.objects.bulk_create(
+            Tag(name=f'bench{i}', color=f'#B{i:05X}', slug=f'bench{i}')
+            for i in range(tags_count)
+        )
+        tags = list(Tag.objects.filter(slug__startswith='bench'))
+        Recipe.objects.bulk_create(
+            (Recipe(author=author,
+                    name=f'bench recipe {i}',
+                    image='recipes/images/bench.png',
+                    text='bench',
+                    cooking_time=random.randint(1, 180))
+             for i in range(recipes_count)),
+            batch_size=5000
+        )
+        TagInRecipe.objects.bulk_create(
+            (TagInRecipe(recipe_id=recipe_id, tag=tag)
+             for recipe_id in Recipe.objects.filter(author=author)
+             .values_list('pk', flat=True).iterator()
+             for tag in random.sample(tags, random.randint(1, 3))),
+            batch_size=5000
+        )
+        return [tag.slug for tag in tags]
+
+    def _run(self, slugs, number):
+        def recipe_filter(mode):
+            data = QueryDict(mutable=True)
+            data.setlist('tags', slugs)
+            data['tags_mode'] = mode
+            return RecipeFilter(data, queryset=Recipe.objects.all()).qs
+
+        variants = {
+            'JOIN': Recipe.objects.filter(tags__slug__in=slugs),
+            'JOIN + DISTINCT': Recipe.objects.filter(
+                tags__slug__in=slugs
+            ).distinct(),
+            'semi-join any': recipe_filter('any'),
+            'semi-join all': recipe_filter('all'),
+        }
+        self.stdout.write(f'Теги: {", ".join(slugs)}')
+        for name, queryset in variants.items():
+            count = queryset.count()
+            elapsed = timeit.timeit(
+                lambda: (queryset.count(),
+                         list(queryset.values_list('pk', flat=True)[:6])),
+                number=number
+            )
+            self.stdout.write(
+                f'  {name}: {count} строк, '
+                f'{elapsed / number * 1000:.1f} мс на страницу с подсчётом'
+            )
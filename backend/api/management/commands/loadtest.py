@@ -0,0 +1,92 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=%D0%B0',
+)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест читающих эндпоинтов: сравнение '
+            'пропускной способности нескольких серверов (WSGI/ASGI)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_urls',
+                            nargs='+',
+                            help='Адреса серверов, например '
+                                 'http://localhost:8000')
+        parser.add_argument('--path',
+                            action='append',
+                            dest='paths',
+                            help='Путь запроса, можно указать несколько раз')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Количество запросов на сервер')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Количество одновременных запросов')
+        parser.add_argument('--token',
+                            help='Токен для заголовка Authorization')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        for base_url in options['base_urls']:
+            urls = [
+                base_url.rstrip('/') + paths[i % len(paths)]
+                for i in range(options['requests'])
+            ]
+            elapsed, latencies, errors = self._run(
+                urls, headers, options['concurrency'], options['timeout']
+            )
+            self._report(base_url, elapsed, latencies, errors)
+
+    @staticmethod
+    def _fetch(url, headers, timeout):
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers),
+                         timeout=timeout) as response:
+                response.read()
+        except (HTTPError, URLError, OSError):
+            return None
+        return time.perf_counter() - started
+
+    def _run(self, urls, headers, concurrency, timeout):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda url: self._fetch(url, headers, timeout), urls
+            ))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(result for result in results if result is not None)
+        return elapsed, latencies, len(results) - len(latencies)
+
+    def _report(self, base_url, elapsed, latencies, errors):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(
+                f'{base_url}: все запросы завершились ошибкой'
+            ))
+            return
+
+        def percentile(value):
+            index = min(len(latencies) - 1, int(len(latencies) * value))
+            return latencies[index] * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{base_url}: {len(latencies) / elapsed:.1f} запр/с, '
+            f'ошибок {errors}, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {percentile(0.95):.1f} мс, '
+            f'p99 {percentile(0.99):.1f} мс'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from foodgram.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = ('Значение заголовка X-Profile для профилирования запроса, '
+            'действует PROFILING_TOKEN_MAX_AGE секунд')
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
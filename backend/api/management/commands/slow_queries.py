@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from foodgram.slow_queries import collect, reset
+
+
+class Command(BaseCommand):
+    help = 'Медленные запросы к БД, собранные всеми процессами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Сколько запросов показать')
+        parser.add_argument('--reset', action='store_true',
+                            help='Очистить журналы после вывода')
+
+    def handle(self, *args, **options):
+        entries = collect()
+        for entry in entries[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f'{entry["total"]:.0f} мс всего, {entry["count"]} раз, '
+                f'до {entry["max"]:.0f} мс'
+            ))
+            self.stdout.write(entry['fingerprint'])
+            for field in ('views', 'frames'):
+                for name, count in sorted(entry[field].items(),
+                                          key=lambda item: -item[1]):
+                    self.stdout.write(f'  {name}: {count}')
+            if entry['plan']:
+                self.stdout.write(entry['plan'])
+            self.stdout.write('')
+
+        if options['reset']:
+            reset()
+        self.stdout.write(self.style.SUCCESS(
+            f'Медленных запросов: {len(entries)}'
+        ))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from recipes.models import Tag
+
+
+def warm_paths(pages):
+    """Адреса, с которых начинается работа с сайтом: справочники и первые
+    страницы ленты рецептов без фильтра, со всеми тегами и с каждым."""
+    yield reverse('api:tags-list')
+    yield reverse('api:ingredients-list')
+
+    slugs = list(Tag.objects.values_list('slug', flat=True))
+    filters = [''] + [f'&tags={slug}' for slug in slugs]
+    if len(slugs) > 1:
+        filters.append(''.join(f'&tags={slug}' for slug in slugs))
+    recipes = reverse('api:recipes-list')
+    for page in range(1, pages + 1):
+        for tags in filters:
+            yield (f'{recipes}?page={page}'
+                   f'&limit={settings.COUNT_RECIPES_ON_HOME_PAGE}{tags}')
+
+
+def warm_caches(host=None, pages=None):
+    """Запрашивает warm_paths анонимно, заполняя кэши ответов.
+
+    Возвращает адреса, на которые пришла ошибка; страниц ленты может
+    быть меньше pages, их 404 ошибкой не считается.
+    """
+    client = Client(HTTP_HOST=host or settings.WARM_CACHES_HOST)
+    failed = []
+    for path in warm_paths(pages or settings.WARM_CACHES_PAGES):
+        if client.get(path).status_code not in (200, 404):
+            failed.append(path)
+    return failed
+
+
+class Command(BaseCommand):
+    help = 'Прогрев кэшей справочников и первых страниц ленты рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host',
+                            help='Хост в ссылках ответов, по умолчанию '
+                                 'WARM_CACHES_HOST')
+        parser.add_argument('--pages', type=int,
+                            help='Сколько страниц ленты прогреть, '
+                                 'по умолчанию WARM_CACHES_PAGES')
+
+    def handle(self, *args, **options):
+        failed = warm_caches(options['host'], options['pages'])
+        for path in failed:
+            self.stdout.write(self.style.WARNING(f'Не прогрет: {path}'))
+        self.stdout.write(self.style.SUCCESS('Кэши прогреты'))
@@ -1,7 +1,18 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import (ListModelMixin,
                                    RetrieveModelMixin)
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from api.serializers import SparseFieldsetSerializer
+from api.throttling import concurrency_limiter, get_scope
+from foodgram.caching import cached, get_version
+
 
 class ListRetrieveMixin(ListModelMixin,
                         RetrieveModelMixin,
@@ -9,3 +20,152 @@ class ListRetrieveMixin(ListModelMixin,
     """Набор представлений, предоставляющий действия
     «получить», «создать» и «список»."""
     pass
+
+
+def parse_fieldset(value):
+    """Разбирает список полей вида 'id,author.username' в дерево
+    {'id': {}, 'author': {'username': {}}}; пустой словарь — поле
+    целиком. None, если список пуст."""
+    tree = {}
+    for path in (value or '').split(','):
+        if not path.strip():
+            continue
+        node = tree
+        for name in path.strip().split('.'):
+            node = node.setdefault(name, {})
+    return tree or None
+
+
+class SparseFieldsetMixin:
+    """Выбор полей ответа параметрами запроса fields, omit и view.
+
+    view — имя готового набора полей из fieldset_presets, full — все
+    поля. Действует только на чтение и только для сериализаторов
+    с SparseFieldsetSerializer.
+    """
+
+    fieldset_presets = {}
+
+    @cached_property
+    def fieldset(self):
+        if self.request.method not in SAFE_METHODS:
+            return None, None
+
+        params = self.request.query_params
+        view = params.get('view', 'full')
+        if view != 'full' and view not in self.fieldset_presets:
+            raise ValidationError({'view': [
+                'Допустимые значения: '
+                + ', '.join(('full', *self.fieldset_presets))
+            ]})
+        fields = params.get('fields') or self.fieldset_presets.get(view)
+        return parse_fieldset(fields), parse_fieldset(params.get('omit'))
+
+    def is_selected(self, name):
+        """Попадёт ли поле верхнего уровня в ответ."""
+        fields, omit = self.fieldset
+        return (
+            (fields is None or name in fields)
+            and (omit is None or omit.get(name) != {})
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsetSerializer):
+            kwargs['fields'], kwargs['omit'] = self.fieldset
+        return super().get_serializer(*args, **kwargs)
+
+
+class LoadSheddingMixin:
+    """Отказ с 503 и Retry-After, когда в процессе уже выполняется
+    LOAD_SHEDDING_LIMITS запросов области действия (throttle_scopes)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = get_scope(self)
+        if concurrency_limiter.acquire(scope):
+            self.shedding_scope = scope
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        scope = getattr(self, 'shedding_scope', None)
+        if scope is not None:
+            self.shedding_scope = None
+            concurrency_limiter.release(scope)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class _Path(str):
+    """Ссылка на сайт в закэшированном ответе: без схемы и хоста."""
+
+
+def _map_strings(data, convert):
+    if isinstance(data, dict):
+        return {key: _map_strings(value, convert)
+                for key, value in data.items()}
+    if isinstance(data, list):
+        return [_map_strings(item, convert) for item in data]
+    if isinstance(data, str):
+        return convert(data)
+    return data
+
+
+class CachedListMixin:
+    """Кэширует ответ действия list по пути и параметрам запроса.
+
+    Ключи лежат в пространстве list_cache_name и сбрасываются вместе
+    с ним через foodgram.caching.invalidate; время жизни — настройка
+    с именем list_cache_timeout. Ответы, зависящие от пользователя,
+    исключаются в is_list_cacheable.
+
+    Хост в ключ не входит: ссылки на сайт (next, картинки) хранятся
+    без схемы и хоста и достраиваются по текущему запросу, поэтому
+    прогретый с любого хоста ответ годится для всех.
+    """
+
+    list_cache_name = None
+    list_cache_timeout = 'REFERENCE_CACHE_TIMEOUT'
+
+    def is_list_cacheable(self, request):
+        return True
+
+    def list_cache_key(self, request):
+        params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+        )
+        signature = repr((request.path, params))
+        digest = hashlib.md5(signature.encode()).hexdigest()
+        name = self.list_cache_name
+        return f'{name}:{get_version(name)}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_list_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        data, has_links = cached(
+            self.list_cache_key(request),
+            lambda: self._strip_host(request, super(
+                CachedListMixin, self
+            ).list(request, *args, **kwargs).data),
+            getattr(settings, self.list_cache_timeout),
+            name=self.list_cache_name
+        )
+        if has_links:
+            data = _map_strings(data, lambda value: (
+                request.build_absolute_uri(value)
+                if isinstance(value, _Path) else value
+            ))
+        return Response(data)
+
+    @staticmethod
+    def _strip_host(request, data):
+        """(данные без хоста в ссылках, были ли ссылки)."""
+        base = request.build_absolute_uri('/')
+        found = []
+
+        def strip(value):
+            if not value.startswith(base):
+                return value
+            found.append(value)
+            return _Path(value[len(base) - 1:])
+
+        data = _map_strings(data, strip)
+        return data, bool(found)
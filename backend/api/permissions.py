@@ -3,4 +3,4 @@ from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 class IsAuthorOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.method in SAFE_METHODS and request.user == obj.author
+        return request.method in SAFE_METHODS or request.user == obj.author
@@ -2,16 +2,21 @@ from django.conf import settings
 from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework.serializers import (
+    FloatField,
     IntegerField,
+    ListField,
     ModelSerializer,
     PrimaryKeyRelatedField,
     ReadOnlyField,
+    Serializer,
     SerializerMethodField,
     ValidationError
 )
 from rest_framework.status import HTTP_400_BAD_REQUEST
 from rest_framework.validators import UniqueTogetherValidator
 
+from foodgram import metrics
+from recipes import outbox
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -23,7 +28,48 @@ from recipes.models import (
 from users.models import Subscription, User
 
 
-class CustomUserSerializer(ModelSerializer):
+class SparseFieldsetSerializer(ModelSerializer):
+    """Сериализатор, выдающий только выбранные поля.
+
+    fields и omit — деревья полей из api.mixins.parse_fieldset;
+    вложенные ключи передаются вложенным сериализаторам.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prune(fields, omit)
+
+    def prune(self, fields=None, omit=None):
+        unknown = (set(fields or ()) | set(omit or ())) - set(self.fields)
+        if unknown:
+            raise ValidationError({'fields': [
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            ]})
+
+        for name in list(self.fields):
+            nested_fields = nested_omit = None
+            if fields is not None:
+                if name not in fields:
+                    self.fields.pop(name)
+                    continue
+                nested_fields = fields[name] or None
+            if omit is not None and name in omit:
+                if not omit[name]:
+                    self.fields.pop(name)
+                    continue
+                nested_omit = omit[name]
+
+            if nested_fields or nested_omit:
+                field = self.fields[name]
+                field = getattr(field, 'child', field)
+                if not isinstance(field, SparseFieldsetSerializer):
+                    raise ValidationError({'fields': [
+                        f'Поле {name} не содержит вложенных полей'
+                    ]})
+                field.prune(nested_fields, nested_omit)
+
+
+class CustomUserSerializer(SparseFieldsetSerializer):
     """Получает информацию о том, подписан ли текущий пользователь
     на пользователя из контекста запроса.
     """
@@ -44,6 +90,9 @@ class CustomUserSerializer(ModelSerializer):
         extra_kwargs = {'password': {'write_only': True}}
 
     def get_is_subscribed(self, obj):
+        # В списках пользователей is_subscribed считается подзапросом
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
         return (
             user.is_authenticated
@@ -51,7 +100,21 @@ class CustomUserSerializer(ModelSerializer):
         )
 
 
-class TagSerializer(ModelSerializer):
+class UserSerializer(CustomUserSerializer):
+    """Пользователь с количеством его рецептов."""
+
+    recipes_count = SerializerMethodField()
+
+    class Meta(CustomUserSerializer.Meta):
+        fields = CustomUserSerializer.Meta.fields + ('recipes_count',)
+
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
+
+
+class TagSerializer(SparseFieldsetSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
@@ -63,7 +126,7 @@ class IngredientSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientInRecipeSerializer(ModelSerializer):
+class IngredientInRecipeSerializer(SparseFieldsetSerializer):
     id = ReadOnlyField(source='ingredient.id')
     name = ReadOnlyField(source='ingredient.name')
     measurement_unit = ReadOnlyField(source='ingredient.measurement_unit')
@@ -107,13 +170,32 @@ class RecipeMinifiedSerializer(ModelSerializer):
         )
 
 
-class SubscriptionSerializer(CustomUserSerializer):
+class CookableRecipeSerializer(RecipeMinifiedSerializer):
+    """Рецепт с долей имеющихся у пользователя ингредиентов."""
+
+    coverage = FloatField(read_only=True)
+    missing = IntegerField(read_only=True)
+
+    class Meta(RecipeMinifiedSerializer.Meta):
+        fields = RecipeMinifiedSerializer.Meta.fields + ('coverage',
+                                                         'missing')
+
+
+class SimilarRecipeSerializer(RecipeMinifiedSerializer):
+    """Рецепт с оценкой сходства с исходным."""
+
+    similarity = FloatField(read_only=True)
+
+    class Meta(RecipeMinifiedSerializer.Meta):
+        fields = RecipeMinifiedSerializer.Meta.fields + ('similarity',)
+
+
+class SubscriptionSerializer(UserSerializer):
     """Информация о подписке пользователя на автора рецептов."""
 
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
 
-    class Meta(CustomUserSerializer.Meta):
+    class Meta(UserSerializer.Meta):
         model = User
         fields = CustomUserSerializer.Meta.fields + ('recipes',
                                                      'recipes_count')
@@ -131,9 +213,6 @@ class SubscriptionSerializer(CustomUserSerializer):
 
         return RecipeMinifiedSerializer(queryset, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class SubscriptionCreateSerializer(ModelSerializer):
     class Meta:
@@ -141,9 +220,12 @@ class SubscriptionCreateSerializer(ModelSerializer):
         fields = ('user', 'author')
 
     def validate(self, attrs):
-        if attrs.get('user').following.filter(
-                author=attrs.get('author')
-        ).exists():
+        if attrs['user'] == attrs['author']:
+            raise ValidationError(
+                detail='Нельзя подписаться на себя',
+                code=HTTP_400_BAD_REQUEST
+            )
+        if attrs['user'].follower.filter(author=attrs['author']).exists():
             raise ValidationError(
                 detail='Вы уже подписаны',
                 code=HTTP_400_BAD_REQUEST
@@ -158,7 +240,7 @@ class SubscriptionCreateSerializer(ModelSerializer):
         ).data
 
 
-class RecipeListSerializer(ModelSerializer):
+class RecipeListSerializer(SparseFieldsetSerializer):
     """Получение полной информации о рецепте."""
 
     author = CustomUserSerializer(read_only=True)
@@ -190,12 +272,23 @@ class RecipeListSerializer(ModelSerializer):
         ingredients_list = IngredientInRecipe.objects.filter(recipe=obj)
         return IngredientInRecipeSerializer(ingredients_list, many=True).data
 
+    def to_representation(self, instance):
+        # Выборки api.views.prepare_recipes считают подписку на автора
+        # подзапросом в запросе рецептов
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.favorites.filter(user=user).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (user.is_authenticated
                 and obj.shopping_carts.filter(user=user).exists())
@@ -238,10 +331,10 @@ class CreateRecipeSerializer(ModelSerializer):
             )
 
     def validate_cooking_time(self, value):
-        if value and int(value) > settings.MAX_INGREDIENTS_COUNT:
+        if not settings.MIN_COOKING_TIME <= value <= settings.MAX_COOKING_TIME:
             raise ValidationError(
-                f'Максимальное время приготовления '
-                f'{settings.MAX_COOKING_TIME} мин.'
+                f'Время приготовления от {settings.MIN_COOKING_TIME} '
+                f'до {settings.MAX_COOKING_TIME} мин.'
             )
         return value
 
@@ -250,22 +343,28 @@ class CreateRecipeSerializer(ModelSerializer):
         ingredients_list = validated_data.pop('ingredients')
         tags_list = validated_data.pop('tags')
 
+        metrics.recipe_image_size.observe(validated_data['image'].size)
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(ingredients_list, recipe)
         self.create_tags(tags_list, recipe)
+        outbox.enqueue('recipe.created', recipe_id=recipe.id)
 
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredients.clear()
-        tags_list = validated_data.pop('tags')
-        ingredients_list = validated_data.pop('ingredients')
-
-        instance.tags.set(tags_list)
-        self.create_ingredients(ingredients_list, instance)
-        self.create_tags(tags_list, instance)
+        if 'image' in validated_data:
+            metrics.recipe_image_size.observe(validated_data['image'].size)
+        # PATCH может менять только часть полей
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data.pop('tags'))
+        if 'ingredients' in validated_data:
+            instance.ingredients.clear()
+            self.create_ingredients(
+                validated_data.pop('ingredients'),
+                instance
+            )
+        outbox.enqueue('recipe.updated', recipe_id=instance.id)
 
         return super().update(instance, validated_data)
 
@@ -299,6 +398,16 @@ class ShoppingCartSerializer(BaseShoppingCartFavoriteSerializer):
         ]
 
 
+class ShoppingCartMultiplierSerializer(ModelSerializer):
+    """Множитель количества ингредиентов рецепта в списке покупок."""
+
+    class Meta:
+        model = ShoppingCart
+        fields = ('recipe', 'multiplier')
+        read_only_fields = ('recipe',)
+        extra_kwargs = {'multiplier': {'required': True}}
+
+
 class FavoriteSerializer(BaseShoppingCartFavoriteSerializer):
     class Meta:
         model = Favorite
@@ -310,3 +419,23 @@ class FavoriteSerializer(BaseShoppingCartFavoriteSerializer):
                 message='Вы уже добавили рецепт в избранное'
             )
         ]
+
+
+class RecipeBatchSerializer(Serializer):
+    """Список id рецептов для пакетного добавления или удаления."""
+
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE
+    )
+
+
+class AuthorBatchSerializer(Serializer):
+    """Список id авторов для пакетной подписки или отписки."""
+
+    authors = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE
+    )
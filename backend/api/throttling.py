@@ -0,0 +1,165 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import APIException
+from rest_framework.status import HTTP_503_SERVICE_UNAVAILABLE
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def get_scope(view):
+    """Область ограничений действия представления из throttle_scopes."""
+    return getattr(view, 'throttle_scopes', {}).get(
+        getattr(view, 'action', None)
+    )
+
+
+def take_token(state, capacity, rate, now):
+    """Забирает токен из корзины state = (токены, время) или None.
+
+    Возвращает новое состояние и сколько секунд ждать, если токенов нет.
+    """
+    tokens, stamp = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            state, wait = take_token(
+                bucket and bucket[:2], capacity, rate, now
+            )
+            full_at = now + (capacity - state[0]) / rate
+            self._buckets[key] = (*state, full_at)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+        return wait
+
+    def _evict(self, now):
+        # Заполненная корзина ничем не отличается от отсутствующей
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[2] > now
+        }
+
+
+class CacheBucketStore:
+    """Корзины в общем кэше, одни на все процессы.
+
+    Чтение и запись не атомарны: при одновременных запросах одного
+    клиента лимит может быть немного превышен.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        state, wait = take_token(self.cache.get(key), capacity, rate, now)
+        self.cache.set(key, state, int(capacity / rate) + 1)
+        return wait
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        if settings.RATE_LIMIT_CACHE:
+            _store = CacheBucketStore(settings.RATE_LIMIT_CACHE)
+        else:
+            _store = LocalBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+    return _store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов корзиной токенов.
+
+    Действия получают область из throttle_scopes представления, частота
+    области — из DEFAULT_THROTTLE_RATES: '10/min' — корзина на 10
+    запросов, пополняемая на 10 токенов в минуту. Корзины раздельные
+    для каждого пользователя, у анонимов — для каждого IP.
+    """
+
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # Частота зависит от действия и известна только в allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = get_scope(view)
+        if self.scope not in self.THROTTLE_RATES:
+            return True
+
+        capacity, duration = self.parse_rate(self.THROTTLE_RATES[self.scope])
+        self.wait_time = get_store().take(
+            self.get_cache_key(request, view),
+            capacity,
+            capacity / duration
+        )
+        return not self.wait_time
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def wait(self):
+        return math.ceil(self.wait_time)
+
+
+class Overloaded(APIException):
+    status_code = HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class ConcurrencyLimiter:
+    """Ограничение числа одновременно выполняемых в процессе запросов
+    каждой области из LOAD_SHEDDING_LIMITS."""
+
+    def __init__(self):
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scope):
+        """Занимает место для запроса области scope. False, если область
+        не ограничена, Overloaded — если свободных мест нет."""
+        limit = settings.LOAD_SHEDDING_LIMITS.get(scope)
+        if not limit:
+            return False
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                scope, threading.BoundedSemaphore(limit)
+            )
+        if not semaphore.acquire(blocking=False):
+            raise Overloaded(settings.LOAD_SHEDDING_RETRY_AFTER)
+        return True
+
+    def release(self, scope):
+        self._semaphores[scope].release()
+
+
+concurrency_limiter = ConcurrencyLimiter()
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -5,6 +6,7 @@ from api.views import (
     CustomUserViewSet,
     IngredientViewSet,
     RecipeViewSet,
+    SyncView,
     TagViewSet
 )
 
@@ -25,7 +27,15 @@ router_v1.register(
     'recipes', RecipeViewSet, basename='recipes'
 )
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_READ_API:
+    from api import async_urls
+
+    urlpatterns += async_urls.urlpatterns
+
+urlpatterns += [
+    path('sync/', SyncView.as_view(), name='sync'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -1,35 +1,65 @@
-from django.db.models import Sum
+import io
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
 from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (AllowAny,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_201_CREATED,
     HTTP_204_NO_CONTENT
 )
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from api.conditional import (
+    conditional_response,
+    recipe_validators,
+    subscriptions_validators
+)
+from api.facets import get_facets, parse_facets
 from api.filters import IngredientFilter, RecipeFilter
-from api.mixins import ListRetrieveMixin
+from api.mixins import (
+    CachedListMixin,
+    ListRetrieveMixin,
+    LoadSheddingMixin,
+    SparseFieldsetMixin
+)
 from api.pagination import CustomPaginator
+from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (
+    AuthorBatchSerializer,
+    CookableRecipeSerializer,
     CreateRecipeSerializer,
-    CustomUserSerializer,
     FavoriteSerializer,
     IngredientSerializer,
+    RecipeBatchSerializer,
+    ShoppingCartMultiplierSerializer,
     ShoppingCartSerializer,
+    SimilarRecipeSerializer,
     SubscriptionCreateSerializer,
     SubscriptionSerializer,
     RecipeListSerializer,
-    TagSerializer
+    TagSerializer,
+    UserSerializer
 )
+from foodgram import metrics
+from recipes import feed, outbox, shopping_list
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (
+    Change,
     Favorite,
     Ingredient,
     IngredientInRecipe,
@@ -37,33 +67,89 @@ from recipes.models import (
     ShoppingCart,
     Tag
 )
+from recipes.signals import LIST_KINDS, collect_changes, record_changes
+from recipes.similarity import similar_recipes
+from recipes.sync import changes_since, current_token
 from users.models import Subscription, User
 
 
-class TagViewSet(ListRetrieveMixin):
+class TagViewSet(CachedListMixin, ListRetrieveMixin):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
+    list_cache_name = 'tags'
 
 
-class IngredientViewSet(ListRetrieveMixin):
+class IngredientViewSet(CachedListMixin, ListRetrieveMixin):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend, SearchFilter)
     filterset_class = IngredientFilter
     pagination_class = None
+    list_cache_name = 'ingredients'
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SparseFieldsetMixin, UserViewSet):
     queryset = User.objects.all()
-    serializer_class = CustomUserSerializer
+    serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPaginator
+    filter_backends = (SearchFilter,)
+    search_fields = ('^username', '^first_name', '^last_name')
     lookup_field = 'id'
+    fieldset_presets = {'card': 'id,username,first_name,last_name'}
+    throttle_scopes = {
+        'subscribe': 'subscribe',
+        'subscribe_batch': 'subscribe',
+    }
+    user_columns = ('email', 'username', 'first_name', 'last_name')
+
+    def get_queryset(self):
+        return self.annotate_users(
+            self.prune_columns(super().get_queryset())
+        )
+
+    def get_instance(self):
+        user = self.request.user
+        if self.request.method != 'GET':
+            return user
+        return self.get_queryset().get(pk=user.pk)
+
+    def prune_columns(self, queryset):
+        if self.fieldset == (None, None):
+            return queryset
+        return queryset.only('id', *(
+            column for column in self.user_columns
+            if self.is_selected(column)
+        ))
+
+    def annotate_users(self, queryset):
+        """is_subscribed и recipes_count подзапросами в том же запросе,
+        что и пользователи, а не отдельными запросами на каждого."""
+        if self.is_selected('is_subscribed'):
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user_id=self.request.user.pk,
+                    author=OuterRef('pk')
+                )
+            ))
+        if self.is_selected('recipes_count'):
+            queryset = queryset.annotate(recipes_count=Coalesce(
+                Subquery(
+                    Recipe.objects.filter(
+                        author=OuterRef('pk')
+                    ).order_by().values('author').annotate(
+                        count=Count('pk')
+                    ).values('count')
+                ),
+                0
+            ))
+        return queryset
 
     @action(detail=True, methods=['POST', 'DELETE'])
+    @transaction.atomic
     def subscribe(self, request, id=None):
         user = request.user
         author = get_object_or_404(User, id=id)
@@ -75,6 +161,7 @@ class CustomUserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            sync_feed(user.id, author.id)
             return Response(serializer.data, status=HTTP_201_CREATED)
 
         get_object_or_404(
@@ -82,34 +169,160 @@ class CustomUserViewSet(UserViewSet):
             user=request.user,
             author=get_object_or_404(User, id=id)
         ).delete()
+        sync_feed(user.id, author.id)
         return Response(status=HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['POST', 'DELETE'], url_path='subscribe')
+    @transaction.atomic
+    def subscribe_batch(self, request):
+        serializer = AuthorBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        author_ids = list(dict.fromkeys(serializer.validated_data['authors']))
+        user = request.user
+        followed = set(Subscription.objects.filter(
+            user=user,
+            author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+
+        if request.method == 'POST':
+            found = set(User.objects.filter(
+                id__in=author_ids
+            ).exclude(id=user.id).values_list('id', flat=True))
+            added = create_new(
+                [Subscription(user=user, author_id=author_id)
+                 for author_id in author_ids
+                 if author_id in found and author_id not in followed],
+                key='author_id'
+            )
+            followed.update(set(author_ids) & found - set(added))
+            record_changes(Change.SUBSCRIPTION, added, user.id)
+            sync_feed(user.id, *added)
+            return Response({'results': batch_results(
+                author_ids, added=added, exists=followed
+            )})
+
+        removed = list(Subscription.objects.select_for_update().filter(
+            user=user,
+            author_id__in=followed
+        ).values_list('author_id', flat=True))
+        with collect_changes():
+            Subscription.objects.filter(
+                user=user,
+                author_id__in=removed
+            ).delete()
+        sync_feed(user.id, *removed)
+        return Response({'results': batch_results(
+            author_ids, removed=removed
+        )})
+
+    @staticmethod
+    def latest_recipes(request):
+        """Рецепты авторов для поля recipes: при recipes_limit — только
+        последние recipes_limit рецептов каждого автора, одним запросом
+        на страницу."""
+        queryset = Recipe.objects.only(
+            'id', 'author', 'name', 'image', 'cooking_time'
+        )
+        recipes_limit = request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return queryset
+        if not recipes_limit.isdigit():
+            raise ValidationError({'recipes_limit': [
+                'Укажите неотрицательное целое число'
+            ]})
+        recipes_limit = int(recipes_limit)
+        return queryset.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).order_by('-pub_date').values('pk')[:recipes_limit]
+        ))
+
     @action(detail=False, methods=['GET'])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        return conditional_response(
+            request,
+            subscriptions_validators(request),
+            lambda: self._subscriptions_page(request)
+        )
+
+    def _subscriptions_page(self, request):
+        queryset = self.annotate_users(self.prune_columns(
+            User.objects.filter(following__user=request.user)
+        ))
+        if self.is_selected('recipes'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipes',
+                queryset=self.latest_recipes(request)
+            ))
         page = self.paginate_queryset(queryset)
+        fields, omit = self.fieldset
         serializer = SubscriptionSerializer(
             page,
             many=True,
+            fields=fields,
+            omit=omit,
             context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(ModelViewSet):
-    queryset = (
-        Recipe.objects.select_related('author')
-        .prefetch_related('ingredients', 'tags').all()
-    )
-    permission_classes = (IsAuthenticatedOrReadOnly,)
+class RecipeViewSet(LoadSheddingMixin,
+                    SparseFieldsetMixin,
+                    CachedListMixin,
+                    ModelViewSet):
+    queryset = Recipe.objects.all()
+    permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = CustomPaginator
     http_method_names = ['get', 'post', 'patch', 'delete']
+    fieldset_presets = {
+        'card': 'id,name,image,tags,cooking_time,author.id,author.username,'
+                'author.first_name,author.last_name,is_favorited,'
+                'is_in_shopping_cart'
+    }
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'export',
+    }
+    list_cache_name = 'recipe_list'
+    list_cache_timeout = 'RECIPE_LIST_CACHE_TIMEOUT'
+
+    def get_queryset(self):
+        return prepare_recipes(
+            super().get_queryset(),
+            self.request.user,
+            self.is_selected
+        )
+
+    def is_list_cacheable(self, request):
+        # У пользователя в выдаче свои отметки избранного и корзины
+        return not request.user.is_authenticated
 
     def perform_update(self, serializer):
         return serializer.save(author=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        facets = parse_facets(request.query_params.get('facets', ''))
+        response = super().list(request, *args, **kwargs)
+        if facets:
+            response.data['facets'] = get_facets(
+                self.filter_queryset(super().get_queryset()),
+                facets,
+                request
+            )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            recipe_validators(kwargs['pk'], request),
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -139,6 +352,16 @@ class RecipeViewSet(ModelViewSet):
     def destroy_shopping_cart(self, request, pk):
         return self._del_recipe(request, pk, ShoppingCart)
 
+    @shopping_cart.mapping.patch
+    def scale_shopping_cart(self, request, pk):
+        serializer = ShoppingCartMultiplierSerializer(
+            get_object_or_404(ShoppingCart, recipe__id=pk, user=request.user),
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
     @action(detail=True, methods=['POST'])
     def favorite(self, request, pk):
         return self._add_recipe(request, pk, FavoriteSerializer)
@@ -147,67 +370,353 @@ class RecipeViewSet(ModelViewSet):
     def destroy_favorite(self, request, pk):
         return self._del_recipe(request, pk, Favorite)
 
+    @action(detail=False, methods=['POST', 'DELETE'],
+            url_path='shopping_cart')
+    def shopping_cart_batch(self, request):
+        return self._batch(request, ShoppingCart)
+
+    @action(detail=False, methods=['DELETE'], url_path='shopping_cart/clear')
+    @transaction.atomic
+    def clear_shopping_cart(self, request):
+        shopping_cart = ShoppingCart.objects.filter(user=request.user)
+        recipe_ids = list(shopping_cart.values_list('recipe_id', flat=True))
+        with collect_changes():
+            shopping_cart.filter(recipe_id__in=recipe_ids).delete()
+        change_counters(ShoppingCart, recipe_ids, -1)
+        return Response(status=HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['POST', 'DELETE'], url_path='favorite')
+    def favorite_batch(self, request):
+        return self._batch(request, Favorite)
+
     @action(detail=False, methods=['GET'])
-    def download_shopping_cart(self, request):
-        filename = 'shop_list.txt'
-        context, headers = self._make_file(request, filename)
+    def cookable(self, request):
+        try:
+            ingredient_ids = {
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',') if value
+            }
+        except ValueError:
+            ingredient_ids = None
+        if not ingredient_ids:
+            raise ValidationError(
+                {'ingredients': ['Укажите id имеющихся ингредиентов']}
+            )
+
+        page = self.paginate_queryset(ingredient_index.search(ingredient_ids))
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, found, total in page]
+        )
+        ranked = []
+        for recipe_id, found, total in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.coverage = round(found / total, 3)
+                recipe.missing = total - found
+                ranked.append(recipe)
+
+        serializer = CookableRecipeSerializer(
+            ranked,
+            many=True,
+            context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
 
-        with open(filename, 'w', encoding='UTF-8') as file:
-            file.write(context)
+    @action(detail=False, methods=['GET'], url_path='feed',
+            permission_classes=(IsAuthenticated,))
+    def subscription_feed(self, request):
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.COUNT_RECIPES_ON_HOME_PAGE
+            ))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {'limit': ['Укажите целое число больше нуля']}
+            )
+        limit = min(limit, settings.FEED_MAX_LIMIT)
+        try:
+            cursor = request.query_params.get('cursor')
+            if cursor:
+                cursor = feed.decode_cursor(cursor)
+        except ValueError:
+            raise ValidationError(
+                {'cursor': ['Некорректные параметры страницы']}
+            )
 
-        return FileResponse(open(filename, 'rb'), headers=headers)
+        page, next_cursor = feed.read(request.user.id, cursor, limit)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, pub_date in page]
+        )
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, pub_date in page
+             if recipe_id in recipes],
+            many=True
+        )
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', next_cursor
+            )
+        return Response({'next': next_url, 'results': serializer.data})
 
-    @staticmethod
-    def _make_file(request, file_name):
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_carts__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(total_amount=Sum('amount')).order_by('ingredient__name')
-
-        shop_list = ''
-        curr_ingredient = None
-        total_amount = 0
-
-        for ingredient in ingredients:
-            name = ingredient.get('ingredient__name')
-            measurement_unit = ingredient.get('ingredient__measurement_unit')
-            ingredient_amount = ingredient.get('total_amount')
-
-            if curr_ingredient and curr_ingredient != name:
-                shop_list += (f'{curr_ingredient} {measurement_unit} - '
-                              f'{total_amount}\n')
-                total_amount = 0
-
-            curr_ingredient = name
-            total_amount += ingredient_amount
-
-        if curr_ingredient:
-            shop_list += (f'{curr_ingredient} {measurement_unit} - '
-                          f'{total_amount}\n')
-
-        headers = {
-            'Content-Disposition': f'attachment; filename={file_name}'
-        }
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.SIMILAR_RECIPES_LIMIT
+            ))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {'limit': ['Укажите целое число больше нуля']}
+            )
+        limit = min(limit, settings.SIMILAR_RECIPES_MAX_LIMIT)
 
-        return shop_list, headers
+        scored = similar_recipes(recipe.id, limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, score in scored]
+        )
+        similar = []
+        for recipe_id, score in scored:
+            if recipe_id in recipes:
+                recipes[recipe_id].similarity = round(score, 3)
+                similar.append(recipes[recipe_id])
+
+        serializer = SimilarRecipeSerializer(
+            similar,
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'],
+            permission_classes=(IsAuthenticated,))
+    def download_shopping_cart(self, request):
+        content = shopping_list.render(
+            shopping_list.aggregate(request.user)
+        ).encode('UTF-8')
+        metrics.shopping_list_size.observe(len(content))
+        return FileResponse(
+            io.BytesIO(content),
+            as_attachment=True,
+            filename='shop_list.txt'
+        )
 
     @staticmethod
+    @transaction.atomic
     def _add_recipe(request, pk, serializer_class):
         recipe = get_object_or_404(Recipe, id=pk)
         data = {'recipe': recipe.id, 'user': request.user.id}
         serializer = serializer_class(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        change_counters(serializer_class.Meta.model, (recipe.id,), 1)
 
         return Response(serializer.data, status=HTTP_201_CREATED)
 
     @staticmethod
+    @transaction.atomic
     def _del_recipe(request, pk, serializer_class):
         get_object_or_404(
             serializer_class,
             recipe__id=pk,
             user=request.user
         ).delete()
+        change_counters(serializer_class, (pk,), -1)
         return Response(status=HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    @transaction.atomic
+    def _batch(request, model):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        user = request.user
+        listed = set(model.objects.filter(
+            user=user,
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+
+        if request.method == 'POST':
+            found = set(Recipe.objects.filter(
+                id__in=recipe_ids
+            ).values_list('id', flat=True))
+            added = create_new(
+                [model(user=user, recipe_id=recipe_id)
+                 for recipe_id in recipe_ids
+                 if recipe_id in found and recipe_id not in listed],
+                key='recipe_id'
+            )
+            listed.update(set(recipe_ids) & found - set(added))
+            record_changes(LIST_KINDS[model], added, user.id)
+            change_counters(model, added, 1)
+            return Response({'results': batch_results(
+                recipe_ids, added=added, exists=listed
+            )})
+
+        removed = list(model.objects.select_for_update().filter(
+            user=user,
+            recipe_id__in=listed
+        ).values_list('recipe_id', flat=True))
+        with collect_changes():
+            model.objects.filter(user=user, recipe_id__in=removed).delete()
+        change_counters(model, removed, -1)
+        return Response({'results': batch_results(
+            recipe_ids, removed=removed
+        )})
+
+
+def prepare_recipes(queryset, user, is_selected=lambda name: True):
+    """Рецепты для RecipeListSerializer с полями, для которых
+    is_selected(имя) истинно: связанные объекты загружаются одним
+    запросом на связь, отметки пользователя считаются подзапросами."""
+    if is_selected('author'):
+        queryset = queryset.select_related('author')
+    if is_selected('tags'):
+        queryset = queryset.prefetch_related('tags')
+    if is_selected('ingredients'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipe_ingredient',
+            queryset=IngredientInRecipe.objects.select_related(
+                'ingredient'
+            )
+        ))
+    if not is_selected('text'):
+        queryset = queryset.defer('text')
+    if not user.is_authenticated:
+        return queryset
+    marks = {
+        'is_favorited': Favorite,
+        'is_in_shopping_cart': ShoppingCart,
+    }
+    for name, model in marks.items():
+        if is_selected(name):
+            queryset = queryset.annotate(**{name: Exists(
+                model.objects.filter(user=user, recipe=OuterRef('pk'))
+            )})
+    if is_selected('author'):
+        queryset = queryset.annotate(author_is_subscribed=Exists(
+            Subscription.objects.filter(
+                user=user,
+                author=OuterRef('author')
+            )
+        ))
+    return queryset
+
+
+def change_counters(model, recipe_ids, delta):
+    if recipe_ids:
+        outbox.enqueue(
+            'counters',
+            model=model._meta.label,
+            recipe_ids=list(recipe_ids),
+            delta=delta
+        )
+
+
+def create_new(instances, key):
+    """Создаёт строки instances и возвращает значения поля key у
+    действительно созданных. Строки, которые успел создать параллельный
+    запрос, пропускаются: bulk_create с ignore_conflicts не сообщает,
+    какие из них вставлены, поэтому при конфликте строки создаются по
+    одной, каждая в своей точке сохранения."""
+    if not instances:
+        return []
+    try:
+        with transaction.atomic():
+            type(instances[0]).objects.bulk_create(instances)
+        return [getattr(instance, key) for instance in instances]
+    except IntegrityError:
+        pass
+    created = []
+    for instance in instances:
+        instance.pk = None
+        try:
+            with transaction.atomic():
+                instance.save(force_insert=True)
+        except IntegrityError:
+            continue
+        created.append(getattr(instance, key))
+    return created
+
+
+def sync_feed(user_id, *author_ids):
+    if author_ids:
+        outbox.enqueue(
+            'feed.sync',
+            key=f'feed:{user_id}',
+            user_id=user_id,
+            author_ids=list(author_ids)
+        )
+
+
+def batch_results(ids, **statuses):
+    """Результат пакетной операции по каждому id: статус из statuses
+    ({статус: id}) или not_found."""
+    status_by_id = {
+        object_id: status
+        for status, object_ids in statuses.items()
+        for object_id in object_ids
+    }
+    return [
+        {'id': object_id, 'status': status_by_id.get(object_id, 'not_found')}
+        for object_id in ids
+    ]
+
+
+class SyncView(APIView):
+    """Изменения рецептов, избранного, списка покупок и подписок
+    после курсора since."""
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({'token': str(current_token()), 'reset': True})
+        try:
+            since = int(since)
+        except ValueError:
+            raise ValidationError({'since': ['Некорректный курсор']})
+
+        token, reset, changes = changes_since(request.user, since)
+        if reset:
+            return Response({'token': str(token), 'reset': True})
+
+        recipe_changes = changes[Change.RECIPE]
+        recipes = prepare_recipes(
+            RecipeViewSet.queryset,
+            request.user
+        ).filter(pk__in=[
+            recipe_id for recipe_id, deleted in recipe_changes.items()
+            if not deleted
+        ])
+        data = {
+            'token': str(token),
+            'reset': False,
+            'recipes': {
+                'updated': RecipeListSerializer(
+                    recipes,
+                    many=True,
+                    context={'request': request}
+                ).data,
+                'deleted': [
+                    recipe_id for recipe_id, deleted in recipe_changes.items()
+                    if deleted
+                ],
+            },
+        }
+        for kind in (Change.FAVORITE, Change.SHOPPING_CART,
+                     Change.SUBSCRIPTION):
+            data[kind] = {
+                'added': [object_id for object_id, deleted
+                          in changes[kind].items() if not deleted],
+                'removed': [object_id for object_id, deleted
+                            in changes[kind].items() if deleted],
+            }
+        return Response(data)
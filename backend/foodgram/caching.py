@@ -0,0 +1,130 @@
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from foodgram.metrics import record_cache
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def _initial_version():
+    # Ключ версии может быть вытеснен раньше значений. Если начинать
+    # заново с 0, вернулись бы версии, под которыми в кэше ещё лежат
+    # старые ответы; время в микросекундах больше любой прежней версии.
+    return time.time_ns() // 1000
+
+
+def get_version(namespace):
+    """Версия пространства ключей: меняется при invalidate."""
+    return cache.get_or_set(f'{namespace}:version', _initial_version, None)
+
+
+def invalidate(namespace):
+    """Делает недействительными все ключи пространства namespace."""
+    try:
+        cache.incr(f'{namespace}:version')
+    except ValueError:
+        cache.set(f'{namespace}:version', _initial_version(), None)
+
+
+def cached(key, compute, timeout, name=None, stale_timeout=None):
+    """Значение из кэша или compute(), защищённое от лавины запросов.
+
+    - Одновременные промахи по ключу в процессе ждут одного вычисления.
+    - Незадолго до истечения значение с растущей вероятностью
+      пересчитывается заранее (XFetch): чем дольше вычисление,
+      тем раньше.
+    - Ещё stale_timeout секунд после истечения отдаётся старое
+      значение, а новое считается в фоне — одним процессом на ключ.
+    """
+    name = name or key.split(':', 1)[0]
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+
+    entry = cache.get(key)
+    if entry is None:
+        record_cache(name, False)
+        return _single_flight(key, compute, timeout, stale_timeout)
+
+    value, expires_at, duration = entry
+    now = time.time()
+    early = now - duration * settings.CACHE_EARLY_REFRESH_BETA * math.log(
+        1 - random.random()
+    )
+    if early >= expires_at:
+        _refresh_in_background(key, compute, timeout, stale_timeout)
+    record_cache(name, now < expires_at)
+    return value
+
+
+def _store(key, compute, timeout, stale_timeout):
+    started = time.perf_counter()
+    value = compute()
+    duration = time.perf_counter() - started
+    cache.set(
+        key,
+        (value, time.time() + timeout, duration),
+        timeout + stale_timeout
+    )
+    return value
+
+
+def _single_flight(key, compute, timeout, stale_timeout):
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = _store(key, compute, timeout, stale_timeout)
+        return flight.value
+    except Exception as error:
+        flight.error = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _refresh_in_background(key, compute, timeout, stale_timeout):
+    lock_key = f'{key}:refresh'
+    if not cache.add(lock_key, 1, settings.CACHE_REFRESH_LOCK_TIMEOUT):
+        return
+
+    def refresh():
+        try:
+            _store(key, compute, timeout, stale_timeout)
+        finally:
+            cache.delete(lock_key)
+
+    def refresh_in_thread():
+        try:
+            refresh()
+        finally:
+            connections.close_all()
+
+    if settings.CACHE_BACKGROUND_REFRESH:
+        threading.Thread(target=refresh_in_thread, daemon=True).start()
+    else:
+        refresh()
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+from pathlib import Path
+
+from decouple import AutoConfig
+
+env = AutoConfig(search_path=Path(__file__).resolve().parent.parent)
+
+wsgi_app = env('GUNICORN_APP', default='foodgram.wsgi:application')
+bind = env('GUNICORN_BIND', default='0:8000')
+
+# gthread для WSGI, uvicorn.workers.UvicornWorker для foodgram.asgi
+worker_class = env('GUNICORN_WORKER_CLASS', default='gthread')
+workers = env(
+    'GUNICORN_WORKERS',
+    default=multiprocessing.cpu_count() * 2 + 1,
+    cast=int
+)
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env(
+    'GUNICORN_MAX_REQUESTS_JITTER',
+    default=100,
+    cast=int
+)
+
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+accesslog = env('GUNICORN_ACCESSLOG', default=None)
+errorlog = '-'
+loglevel = env('GUNICORN_LOGLEVEL', default='info')
+
+
+def on_starting(server):
+    # Значения метрик прошлого запуска сервера не нужны
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from foodgram import metrics
+
+    metrics.reset()
+
+
+def when_ready(server):
+    from django.conf import settings
+
+    if (workers > 1 and settings.CACHES['default']['BACKEND']
+            == 'django.core.cache.backends.locmem.LocMemCache'):
+        server.log.warning(
+            'Кэш в памяти процесса при %s воркерах: сброс кэша не доходит '
+            'до других воркеров, задайте CACHE_BACKEND и CACHE_LOCATION',
+            workers
+        )
+    if preload_app:
+        from foodgram.warmup import warm_up
+
+        warm_up()
+        server.log.info('Приложение прогрето в мастер-процессе')
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def child_exit(server, worker):
+    # Файл завершившегося воркера переносится в общую сумму, иначе после
+    # каждого max_requests в METRICS_DIR остаётся ещё один файл
+    from django.conf import settings
+
+    from foodgram import metrics
+
+    if settings.METRICS_ENABLED:
+        metrics.merge_exited(worker.pid)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        from foodgram.warmup import warm_up
+
+        warm_up()
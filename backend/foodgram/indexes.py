@@ -0,0 +1,27 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db.backends.ddl_references import Statement
+from django.db.models import Index
+
+
+class PostgresOnlyIndex(Index):
+    """Индекс, который создаётся только на PostgreSQL.
+
+    Для индексов по выражениям с классом операторов (OpClass): на SQLite
+    LIKE без учёта регистра их не использует, там нужны индексы NOCASE
+    (recipes.indexes). Пустая команда вместо CREATE и DROP INDEX
+    оставляет модели и миграции одинаковыми для всех СУБД.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+class TrigramIndex(PostgresOnlyIndex, GinIndex):
+    """GIN-индекс для поиска по подстроке (расширение pg_trgm)."""
@@ -0,0 +1,391 @@
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+FILE_PATTERN = 'metrics-*.json'
+# Сумма значений завершившихся процессов; имя подходит под FILE_PATTERN
+EXITED_FILE = 'metrics-exited.json'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = tuple(2 ** power for power in range(10, 25, 2))
+LAG_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Registry:
+    """Метрики процесса.
+
+    Каждый процесс раз в METRICS_FLUSH_INTERVAL секунд и при выходе
+    пишет свои значения в METRICS_DIR; /metrics складывает файлы всех
+    процессов. Файл завершившегося воркера gunicorn прибавляется к
+    EXITED_FILE и удаляется (merge_exited), поэтому счётчики не теряются
+    при перезапуске воркеров, а файлов не больше, чем живых процессов.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.gauges = []
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        self.values[metric.name] = {}
+
+    def update(self, metric, labels, update):
+        key = tuple(labels[name] for name in metric.labelnames)
+        with self._lock:
+            values = self.values[metric.name]
+            values[key] = update(values.get(key))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.values.items()
+            }
+
+    def flush_if_due(self):
+        if (time.monotonic() - self._flushed_at
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.monotonic()
+        if settings.METRICS_ENABLED:
+            _write(process_file(os.getpid()), self.snapshot())
+
+
+registry = Registry()
+
+
+def process_file(pid):
+    return os.path.join(
+        settings.METRICS_DIR,
+        FILE_PATTERN.replace('*', str(pid))
+    )
+
+
+def _read(path):
+    try:
+        with open(path, encoding='UTF-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='UTF-8') as file:
+        json.dump(snapshot, file)
+    os.replace(path + '.tmp', path)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        registry.update(self, labels, lambda value: (value or 0) + amount)
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, key, value):
+        yield '', key, value
+
+
+class Gauge:
+    """Значение, которое вычисляется при каждом запросе /metrics.
+
+    callback возвращает число или None, если значения нет. Между
+    процессами такие значения не складываются и в файлы не пишутся.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        registry.gauges.append(self)
+
+    def render(self):
+        try:
+            value = self.callback()
+        except DatabaseError:
+            value = None
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.kind}']
+        if value is not None:
+            lines.append(f'{self.name} {value}')
+        return lines
+
+
+class Histogram:
+    """Гистограмма: значение хранится как [счётчики корзин..., сумма]."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        registry.register(self)
+
+    def observe(self, amount, **labels):
+        def update(value):
+            value = value or [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    value[index] += 1
+                    break
+            else:
+                value[len(self.buckets)] += 1
+            value[-1] += amount
+            return value
+
+        registry.update(self, labels, update)
+
+    @staticmethod
+    def merge(value, other):
+        return [first + second for first, second in zip(value, other)]
+
+    def samples(self, key, value):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), value):
+            cumulative += count
+            yield '_bucket', (*key, ('le', str(bound))), cumulative
+        yield '_sum', key, value[-1]
+        yield '_count', key, cumulative
+
+
+def _merge(snapshots):
+    """Складывает снимки процессов: {имя: {метки: значение}}."""
+    merged = {name: {} for name in registry.metrics}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            metric = registry.metrics.get(name)
+            if metric is None:
+                continue
+            for key, value in values:
+                key = tuple(key)
+                if key in merged[name]:
+                    value = metric.merge(merged[name][key], value)
+                merged[name][key] = value
+    return merged
+
+
+def collect():
+    """Значения метрик всех процессов: {имя: {метки: значение}}."""
+    snapshots = [registry.snapshot()]
+    own_file = process_file(os.getpid())
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, FILE_PATTERN)):
+        if path != own_file:
+            snapshots.append(_read(path))
+    return _merge(snapshot for snapshot in snapshots if snapshot)
+
+
+def merge_exited(pid):
+    """Прибавляет значения завершившегося процесса к EXITED_FILE и
+    удаляет его файл. Вызывается в мастере gunicorn (child_exit), по
+    одному процессу за раз."""
+    path = process_file(pid)
+    snapshot = _read(path)
+    if snapshot is None:
+        return
+    exited = os.path.join(settings.METRICS_DIR, EXITED_FILE)
+    merged = _merge(
+        item for item in (_read(exited), snapshot) if item
+    )
+    _write(exited, {
+        name: [[list(key), value] for key, value in values.items()]
+        for name, values in merged.items()
+    })
+    os.remove(path)
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def render():
+    """Метрики в текстовом формате Prometheus."""
+    lines = []
+    for name, values in collect().items():
+        metric = registry.metrics[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(values.items()):
+            labelled = tuple(zip(metric.labelnames, key))
+            for suffix, labels, sample in metric.samples(labelled, value):
+                label_text = ','.join(
+                    f'{label}="{_escape(label_value)}"'
+                    for label, label_value in labels
+                )
+                label_text = f'{{{label_text}}}' if label_text else ''
+                lines.append(f'{name}{suffix}{label_text} {sample}')
+    for gauge in registry.gauges:
+        lines.extend(gauge.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, FILE_PATTERN)):
+        os.remove(path)
+
+
+http_requests = Counter(
+    'foodgram_http_requests_total',
+    'Запросы к приложению',
+    ('route', 'method', 'status')
+)
+http_request_duration = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса',
+    ('route', 'method')
+)
+db_queries = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество запросов к БД за один запрос к приложению',
+    ('route',),
+    buckets=COUNT_BUCKETS
+)
+db_duration = Histogram(
+    'foodgram_db_duration_seconds_per_request',
+    'Время запросов к БД за один запрос к приложению',
+    ('route',)
+)
+cache_requests = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кэшу',
+    ('cache', 'result')
+)
+recipe_image_size = Histogram(
+    'foodgram_recipe_image_bytes',
+    'Размер загруженных картинок рецептов',
+    buckets=SIZE_BUCKETS
+)
+shopping_list_size = Histogram(
+    'foodgram_shopping_list_bytes',
+    'Размер выгруженных списков покупок',
+    buckets=SIZE_BUCKETS
+)
+outbox_messages = Counter(
+    'foodgram_outbox_messages_total',
+    'Выполненные отложенные действия',
+    ('topic', 'result')
+)
+outbox_lag = Histogram(
+    'foodgram_outbox_lag_seconds',
+    'Задержка от записи отложенного действия до начала выполнения',
+    ('topic',),
+    buckets=LAG_BUCKETS
+)
+
+
+# Метод запроса задаёт клиент: прочие значения сводятся к 'other',
+# чтобы произвольные методы не плодили серии
+HTTP_METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE'
+))
+
+
+def method_label(method):
+    return method if method in HTTP_METHODS else 'other'
+
+
+def record_cache(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+class QueryCounter:
+    """execute_wrapper, считающий запросы к БД и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Время, статус и запросы к БД каждого запроса с метками маршрута.
+
+    Маршрут — имя из роутера (api:recipes-list), поэтому меток мало.
+    Без METRICS_ENABLED middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        method = method_label(request.method)
+        http_requests.inc(
+            route=route,
+            method=method,
+            status=str(response.status_code)
+        )
+        http_request_duration.observe(
+            duration,
+            route=route,
+            method=method
+        )
+        db_queries.observe(queries.count, route=route)
+        db_duration.observe(queries.duration, route=route)
+        registry.flush_if_due()
+        return response
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = settings.METRICS_TOKEN
+    if not token or not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', '').encode(),
+        f'Bearer {token}'.encode()
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
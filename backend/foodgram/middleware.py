@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import csrf
+
+
+class PathScopedMiddlewareMixin:
+    """Пропускает запросы с префиксами SESSIONLESS_PATH_PREFIXES
+    мимо middleware, нужных только админке.
+
+    API авторизуется по токену, поэтому сессии, CSRF и сообщения
+    для него не загружаются.
+    """
+
+    @staticmethod
+    def is_skipped(request):
+        return request.path_info.startswith(settings.SESSIONLESS_PATH_PREFIXES)
+
+    def __call__(self, request):
+        if self.is_skipped(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Обработчик Django вызывает process_view отдельно от __call__
+        process_view = getattr(super(), 'process_view', None)
+        if process_view is None or self.is_skipped(request):
+            return None
+        return process_view(request, view_func, view_args, view_kwargs)
+
+
+class SessionMiddleware(PathScopedMiddlewareMixin,
+                        sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(PathScopedMiddlewareMixin,
+                         csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(PathScopedMiddlewareMixin,
+                               auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(PathScopedMiddlewareMixin,
+                        messages_middleware.MessageMiddleware):
+    pass
@@ -0,0 +1,169 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+PROFILING_SALT = 'foodgram.profiling'
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+
+
+def make_token():
+    """Значение заголовка X-Profile, включающего профилирование запроса."""
+    return signing.dumps('profile', salt=PROFILING_SALT)
+
+
+def is_valid_token(token):
+    try:
+        signing.loads(
+            token,
+            salt=PROFILING_SALT,
+            max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class StackSampler:
+    """Снимает стек потока thread_id каждые interval секунд.
+
+    Стек — кортеж кадров (функция, файл, строка начала функции)
+    от корня к листу.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        last = self.started
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples.append((self._stack(frame), now - last))
+            last = now
+
+    @staticmethod
+    def _stack(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+
+def collapsed(sampler):
+    """Профиль в формате collapsed stacks для flamegraph.pl."""
+    counts = Counter(stack for stack, _ in sampler.samples)
+    return ''.join(
+        ';'.join(f'{name} ({os.path.basename(path)}:{line})'
+                 for name, path, line in stack) + f' {count}\n'
+        for stack, count in counts.items()
+    )
+
+
+def speedscope(sampler, name):
+    """Профиль в формате speedscope.app."""
+    frames = {}
+    samples = []
+    for stack, _ in sampler.samples:
+        samples.append([
+            frames.setdefault(frame, len(frames)) for frame in stack
+        ])
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'foodgram',
+        'shared': {'frames': [
+            {'name': function, 'file': path, 'line': line}
+            for function, path, line in frames
+        ]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': sampler.duration,
+            'samples': samples,
+            'weights': [weight for _, weight in sampler.samples],
+        }],
+    })
+
+
+class ProfilingMiddleware:
+    """Профилирует долю PROFILING_SAMPLE_RATE запросов и запросы
+    с подписанным заголовком X-Profile (manage.py profiling_token).
+
+    Профиль пишется в PROFILING_DIR в формате PROFILING_FORMAT
+    (speedscope или collapsed), имя файла содержит имя маршрута
+    и метод. Без PROFILING_ENABLED middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(
+            threading.get_ident(),
+            settings.PROFILING_INTERVAL
+        )
+        sampler.start()
+        try:
+            return self.get_response(request)
+        finally:
+            sampler.stop()
+            self.save(request, sampler)
+
+    @staticmethod
+    def should_profile(request):
+        token = request.META.get(PROFILING_HEADER)
+        if token:
+            return is_valid_token(token)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    @staticmethod
+    def save(request, sampler):
+        match = request.resolver_match
+        route = match.view_name if match else 'unresolved'
+        name = f'{route} {request.method} {request.path}'
+        tag = re.sub(r'[^\w.-]+', '_', f'{route}-{request.method}')
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+
+        if settings.PROFILING_FORMAT == 'collapsed':
+            extension, content = 'collapsed', collapsed(sampler)
+        else:
+            extension, content = 'speedscope.json', speedscope(sampler, name)
+        path = os.path.join(
+            settings.PROFILING_DIR,
+            f'{stamp}-{tag}-{os.getpid()}-{threading.get_ident()}.{extension}'
+        )
+        with open(path, 'w', encoding='UTF-8') as file:
+            file.write(content)
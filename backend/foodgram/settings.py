@@ -1,3 +1,5 @@
+import tempfile
+from decimal import Decimal
 from pathlib import Path
 
 from decouple import AutoConfig, Csv
@@ -17,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -29,15 +32,49 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
+    'foodgram.slow_queries.SlowQueryMiddleware',
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'foodgram.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'foodgram.middleware.CsrfViewMiddleware',
+    'foodgram.middleware.AuthenticationMiddleware',
+    'foodgram.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# API авторизуется по токену: сессии, CSRF и сообщения нужны только админке
+SESSIONLESS_PATH_PREFIXES = ('/api/',)
+
+# Выборочное профилирование запросов: доля запросов и запросы
+# с подписанным заголовком X-Profile, профили пишутся в PROFILING_DIR
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_INTERVAL = config('PROFILING_INTERVAL', default=0.005, cast=float)
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_FORMAT = config('PROFILING_FORMAT', default='speedscope')
+PROFILING_TOKEN_MAX_AGE = 24 * 60 * 60
+
+# Журнал запросов к БД дольше SLOW_QUERY_THRESHOLD_MS с планами EXPLAIN
+# (на PostgreSQL); процессы сбрасывают его в SLOW_QUERY_DIR
+SLOW_QUERY_ENABLED = config('SLOW_QUERY_ENABLED', default=False, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_DIR = config('SLOW_QUERY_DIR', default=str(BASE_DIR / 'slow_queries'))
+SLOW_QUERY_FLUSH_INTERVAL = 30
+SLOW_QUERY_MAX_FINGERPRINTS = 500
+
+# Метрики для Prometheus на /metrics; процессы складывают свои значения
+# в METRICS_DIR, который очищается при запуске gunicorn. /metrics
+# отвечает только на запросы с METRICS_TOKEN
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_DIR = config(
+    'METRICS_DIR',
+    default=str(Path(tempfile.gettempdir()) / 'foodgram-metrics')
+)
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
@@ -112,6 +149,102 @@ MAX_COOKING_TIME = 5000
 MIN_INGREDIENTS_COUNT = 1
 MAX_INGREDIENTS_COUNT = 10_000
 COUNT_RECIPES_ON_HOME_PAGE = 6
+MIN_CART_MULTIPLIER = Decimal('0.1')
+MAX_CART_MULTIPLIER = Decimal('100')
+CHANGE_KIND_MAX_LENGTH = 16
+
+# Наибольшее количество id в одном пакетном запросе
+BATCH_MAX_SIZE = 100
+
+# Фасеты ленты рецептов: интервалы времени приготовления в минутах
+COOKING_TIME_BUCKETS = ((0, 15), (15, 30), (30, 60), (60, None))
+FACETS_CACHE_TIMEOUT = config('FACETS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Без переменных окружения — кэш в памяти процесса, только для
+# разработки: у каждого воркера gunicorn он свой, и сброс кэша в одном
+# не доходит до остальных. В infra задан общий memcached
+# (django.core.cache.backends.memcached.PyMemcacheCache)
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Кэш без лавины запросов: значение пересчитывается заранее
+# с вероятностью, растущей к истечению (чем больше BETA, тем раньше),
+# и ещё CACHE_STALE_TIMEOUT секунд после истечения отдаётся старым,
+# пока новое считается в фоне
+CACHE_STALE_TIMEOUT = config('CACHE_STALE_TIMEOUT', default=60, cast=int)
+CACHE_EARLY_REFRESH_BETA = config('CACHE_EARLY_REFRESH_BETA', default=1.0, cast=float)
+CACHE_REFRESH_LOCK_TIMEOUT = 30
+CACHE_BACKGROUND_REFRESH = config('CACHE_BACKGROUND_REFRESH', default=True, cast=bool)
+REFERENCE_CACHE_TIMEOUT = config('REFERENCE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+RECIPE_LIST_CACHE_TIMEOUT = config('RECIPE_LIST_CACHE_TIMEOUT', default=60, cast=int)
+
+# Прогрев кэшей: справочники и первые WARM_CACHES_PAGES страниц ленты
+# рецептов; при WARM_CACHES_ON_STARTUP — при запуске gunicorn.
+# WARM_CACHES_HOST должен проходить ALLOWED_HOSTS, на ключи и ссылки
+# в ответах он не влияет
+WARM_CACHES_HOST = config('WARM_CACHES_HOST', default='localhost')
+WARM_CACHES_PAGES = config('WARM_CACHES_PAGES', default=3, cast=int)
+WARM_CACHES_ON_STARTUP = config('WARM_CACHES_ON_STARTUP', default=False, cast=bool)
+
+# Индекс «ингредиент → рецепты» для подбора рецептов по продуктам
+INGREDIENT_INDEX_CHUNK_SIZE = 10_000
+INGREDIENT_INDEX_MAX_PENDING = 1000
+
+# Похожие рецепты: MinHash из PERMUTATIONS хешей, разбитый на BANDS полос
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SIMILAR_RECIPES_LIMIT = 6
+SIMILAR_RECIPES_MAX_LIMIT = 50
+
+# Лента подписок: рецепты авторов с числом подписчиков не больше
+# FEED_FANOUT_MAX_FOLLOWERS раскладываются по лентам при публикации,
+# рецепты остальных читаются при запросе ленты
+FEED_FANOUT_MAX_FOLLOWERS = config('FEED_FANOUT_MAX_FOLLOWERS', default=1000, cast=int)
+FEED_PULL_AUTHORS_CACHE_TIMEOUT = 5 * 60
+FEED_BACKFILL_SIZE = 50
+FEED_BATCH_SIZE = 1000
+FEED_MAX_LIMIT = 100
+
+# Синхронизация клиентов по журналу изменений
+SYNC_MAX_CHANGES = 1000
+SYNC_LOG_RETENTION_DAYS = config('SYNC_LOG_RETENTION_DAYS', default=30, cast=int)
+
+# Счётчики популярности рецептов: при включённом отложенном режиме
+# изменения копятся в памяти процесса и пишутся в БД пачками раз в
+# RECIPE_COUNTERS_FLUSH_INTERVAL секунд или по RECIPE_COUNTERS_FLUSH_SIZE
+# рецептов. При аварийном завершении процесса они теряются, поэтому
+# с этим режимом manage.py reconcile_counters нужно запускать
+# по расписанию
+RECIPE_COUNTERS_WRITE_BEHIND = config('RECIPE_COUNTERS_WRITE_BEHIND', default=False, cast=bool)
+RECIPE_COUNTERS_FLUSH_INTERVAL = config('RECIPE_COUNTERS_FLUSH_INTERVAL', default=5, cast=float)
+RECIPE_COUNTERS_FLUSH_SIZE = config('RECIPE_COUNTERS_FLUSH_SIZE', default=100, cast=int)
+
+# Побочные действия записей (лента подписок, счётчики, похожие рецепты):
+# при OUTBOX_ENABLED пишутся в outbox в транзакции запроса и выполняются
+# manage.py run_worker, иначе выполняются сразу в запросе
+OUTBOX_ENABLED = config('OUTBOX_ENABLED', default=False, cast=bool)
+OUTBOX_TOPIC_MAX_LENGTH = 64
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_THREADS = config('OUTBOX_THREADS', default=4, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=1, cast=float)
+OUTBOX_LEASE_SECONDS = 5 * 60
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_BACKOFF_BASE = 2
+OUTBOX_BACKOFF_MAX = 60 * 60
+
+# Выгрузка и загрузка данных (export_data, import_data): строк
+# на одно чтение из БД и на одну вставку
+DATA_TRANSFER_CHUNK_SIZE = 2000
+
+# Асинхронные версии читающих эндпоинтов для запуска под ASGI
+ASYNC_READ_API = config('ASYNC_READ_API', default=False, cast=bool)
 
 # permissions
 REST_FRAMEWORK = {
@@ -124,7 +257,28 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPaginator',
     'PAGE_SIZE': COUNT_RECIPES_ON_HOME_PAGE,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'export': config('THROTTLE_EXPORT_RATE', default='10/min'),
+        'recipe_write': config('THROTTLE_RECIPE_WRITE_RATE', default='30/min'),
+        'subscribe': config('THROTTLE_SUBSCRIBE_RATE', default='60/min'),
+    },
+}
+
+# Корзины ограничения частоты: '' — в памяти процесса, иначе имя кэша
+# из CACHES, общего для всех процессов (в infra — default, memcached)
+RATE_LIMIT_CACHE = config('RATE_LIMIT_CACHE', default='')
+RATE_LIMIT_MAX_KEYS = 100_000
+
+# Сколько запросов области одновременно выполняет один процесс,
+# остальные получают 503
+LOAD_SHEDDING_LIMITS = {
+    'export': config('EXPORT_MAX_CONCURRENCY', default=2, cast=int),
+    'recipe_write': config('RECIPE_WRITE_MAX_CONCURRENCY', default=4, cast=int),
 }
+LOAD_SHEDDING_RETRY_AFTER = 5
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -134,8 +288,8 @@ DJOSER = {
         'user_list': ('rest_framework.permissions.AllowAny',),
     },
     'SERIALIZERS': {
-        'current_user': 'api.serializers.CustomUserSerializer',
-        'user': 'api.serializers.CustomUserSerializer',
+        'current_user': 'api.serializers.UserSerializer',
+        'user': 'api.serializers.UserSerializer',
     },
 }
 
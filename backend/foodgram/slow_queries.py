@@ -0,0 +1,214 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+FILE_PATTERN = 'slow_queries-*.json'
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL без значений: литералы и списки параметров IN сворачиваются,
+    чтобы запросы, различающиеся только данными, совпадали."""
+    sql = PLACEHOLDER_LISTS.sub('(...)', LITERALS.sub('%s', sql))
+    return SPACES.sub(' ', sql).strip()
+
+
+def origin():
+    """Последний кадр стека из кода проекта."""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(str(settings.BASE_DIR)) and path != __file__:
+            return (f'{os.path.relpath(path, settings.BASE_DIR)}:'
+                    f'{frame.lineno} in {frame.name}')
+    return None
+
+
+class SlowQueryLog:
+    """Медленные запросы процесса, сгруппированные по fingerprint.
+
+    Раз в SLOW_QUERY_FLUSH_INTERVAL секунд и при выходе журнал пишется
+    в SLOW_QUERY_DIR, откуда его собирает manage.py slow_queries.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def add(self, sql, duration, view, frame, plan):
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= settings.SLOW_QUERY_MAX_FINGERPRINTS:
+                    return
+                entry = self.entries[key] = {
+                    'fingerprint': key,
+                    'sql': sql,
+                    'count': 0,
+                    'total': 0,
+                    'max': 0,
+                    'views': {},
+                    'frames': {},
+                    'plan': None,
+                }
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            entry['views'][view] = entry['views'].get(view, 0) + 1
+            entry['frames'][frame] = entry['frames'].get(frame, 0) + 1
+            entry['plan'] = entry['plan'] or plan
+            flush = (time.monotonic() - self._flushed_at
+                     >= settings.SLOW_QUERY_FLUSH_INTERVAL)
+        if flush:
+            self.flush()
+
+    def needs_plan(self, sql):
+        """Нужен ли план запроса: его fingerprint будет записан и ещё
+        без плана. Проверяется до EXPLAIN, чтобы не выполнять его для
+        запросов сверх SLOW_QUERY_MAX_FINGERPRINTS."""
+        with self._lock:
+            entry = self.entries.get(fingerprint(sql))
+            if entry is None:
+                return (len(self.entries)
+                        < settings.SLOW_QUERY_MAX_FINGERPRINTS)
+            return entry['plan'] is None
+
+    def flush(self):
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            if not self.entries:
+                return
+            content = json.dumps(list(self.entries.values()))
+        os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.SLOW_QUERY_DIR,
+            FILE_PATTERN.replace('*', str(os.getpid()))
+        )
+        with open(path + '.tmp', 'w', encoding='UTF-8') as file:
+            file.write(content)
+        os.replace(path + '.tmp', path)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def collect():
+    """Журналы всех процессов, объединённые по fingerprint."""
+    merged = {}
+    pattern = os.path.join(settings.SLOW_QUERY_DIR, FILE_PATTERN)
+    for path in glob.glob(pattern):
+        with open(path, encoding='UTF-8') as file:
+            for entry in json.load(file):
+                total = merged.setdefault(entry['fingerprint'], {
+                    **entry, 'count': 0, 'total': 0, 'max': 0,
+                    'views': {}, 'frames': {},
+                })
+                total['count'] += entry['count']
+                total['total'] += entry['total']
+                total['max'] = max(total['max'], entry['max'])
+                total['plan'] = total['plan'] or entry['plan']
+                for field in ('views', 'frames'):
+                    for name, count in entry[field].items():
+                        total[field][name] = (
+                            total[field].get(name, 0) + count
+                        )
+    return sorted(
+        merged.values(),
+        key=lambda entry: entry['total'],
+        reverse=True
+    )
+
+
+def reset():
+    pattern = os.path.join(settings.SLOW_QUERY_DIR, FILE_PATTERN)
+    for path in glob.glob(pattern):
+        os.remove(path)
+
+
+class QueryTimer:
+    """execute_wrapper, записывающий запросы дольше
+    SLOW_QUERY_THRESHOLD_MS в slow_query_log."""
+
+    def __init__(self, request):
+        self.request = request
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        # Упавший запрос не записывается: транзакция уже прервана, и
+        # EXPLAIN в ней заменил бы исходную ошибку своей
+        result = execute(sql, params, many, context)
+        duration = (time.perf_counter() - started) * 1000
+        if (duration >= settings.SLOW_QUERY_THRESHOLD_MS
+                and not self.explaining):
+            try:
+                self.record(sql, params, many, context, duration)
+            except Exception:
+                logger.exception('Медленный запрос не записан')
+        return result
+
+    def record(self, sql, params, many, context, duration):
+        match = self.request.resolver_match
+        plan = None
+        if not many and slow_query_log.needs_plan(sql):
+            plan = self.explain(context['connection'], sql, params)
+        slow_query_log.add(
+            sql,
+            duration,
+            match.view_name if match else self.request.path,
+            origin(),
+            plan
+        )
+
+    def explain(self, connection, sql, params):
+        """План запроса без выполнения, только на PostgreSQL."""
+        if (connection.vendor != 'postgresql'
+                or not sql.lstrip().upper().startswith('SELECT')):
+            return None
+        self.explaining = True
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN (ANALYZE off) {sql}', params)
+                    return '\n'.join(row[0] for row in cursor.fetchall())
+        except DatabaseError:
+            return None
+        finally:
+            self.explaining = False
+
+
+class SlowQueryMiddleware:
+    """Включает QueryTimer на время запроса для всех подключений к БД.
+
+    Без SLOW_QUERY_ENABLED middleware отключается целиком.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            return self.get_response(request)
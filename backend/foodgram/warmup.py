@@ -0,0 +1,35 @@
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Прогревает процесс до приёма первых запросов.
+
+    Импортирует представления и сериализаторы через URLconf,
+    заполняет кэш типов содержимого, при WARM_CACHES_ON_STARTUP —
+    кэши ответов (manage.py warm_caches), и закрывает соединения с БД,
+    чтобы они не наследовались рабочими процессами после fork.
+
+    Прогрев не обязателен: если БД ещё недоступна или не мигрирована
+    (первый docker compose up), ошибка пишется в лог, а сервер
+    запускается дальше.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict
+
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+        if settings.WARM_CACHES_ON_STARTUP:
+            call_command('warm_caches')
+    except (DatabaseError, CommandError):
+        logger.exception('Прогрев пропущен')
+    finally:
+        connections.close_all()
@@ -1,27 +1,29 @@
 from django.contrib import admin
+from django.utils import timezone
 
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientInRecipe,
+    OutboxMessage,
     Recipe,
     ShoppingCart,
     Tag
 )
+from recipes.similarity import update_signatures
 from recipes.validators import IngredientInRecipeFormSetValidator
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
-    list_filter = ('name',)
     search_fields = ('name', 'slug')
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
 
 
@@ -31,31 +33,65 @@ class IngredientInRecipeAdmin(admin.TabularInline):
     min_num = 1
     validate_min = True
     formset = IngredientInRecipeFormSetValidator
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe',
+            'ingredient'
+        )
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'get_favorites_count')
-    list_filter = ('name', 'author__username', 'tags__name')
-    search_fields = ('name', 'author__username', 'tags__name')
-    readonly_fields = ('get_favorites_count',)
+    list_display = ('name', 'author', 'get_favorites_count', 'in_cart_count')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username')
+    readonly_fields = ('get_favorites_count', 'in_cart_count')
+    autocomplete_fields = ('author',)
     inlines = (IngredientInRecipeAdmin,)
+    show_full_result_count = False
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_signatures(form.instance.id)
 
     def get_favorites_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     get_favorites_count.short_description = 'Добавлено в избранных'
+    get_favorites_count.admin_order_field = 'favorites_count'
 
 
-@admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class BaseShoppingCartFavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
     list_filter = ('recipe__tags',)
     search_fields = ('recipe__name', 'user__username')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
+
+
+@admin.register(ShoppingCart)
+class ShoppingCartAdmin(BaseShoppingCartFavoriteAdmin):
+    pass
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
-    list_filter = ('recipe__tags',)
-    search_fields = ('recipe__name', 'user__username')
+class FavoriteAdmin(BaseShoppingCartFavoriteAdmin):
+    pass
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('topic', 'key', 'created_at', 'available_at',
+                    'attempts', 'failed')
+    list_filter = ('failed', 'topic')
+    readonly_fields = ('created_at',)
+    show_full_result_count = False
+    actions = ('retry',)
+
+    @admin.action(description='Повторить')
+    def retry(self, request, queryset):
+        queryset.update(failed=False, attempts=0, available_at=timezone.now())
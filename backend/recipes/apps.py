@@ -1,7 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
+        from recipes.indexes import (extensions_handler,
+                                     vendor_indexes_handler)
+
+        pre_migrate.connect(extensions_handler, sender=self)
+        post_migrate.connect(vendor_indexes_handler, sender=self)
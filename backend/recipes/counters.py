@@ -0,0 +1,144 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_cart_count',
+}
+
+
+def actual_count(model):
+    """Подзапрос: число строк model у рецепта, None — если их нет."""
+    return Subquery(
+        model.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(total=Count('pk'))
+        .values('total'),
+        output_field=IntegerField()
+    )
+
+
+def recount(model, recipe_ids):
+    """Пересчитывает счётчик модели model у рецептов recipe_ids по
+    строкам списка; повторный вызов ничего не меняет."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(**{
+        COUNTER_FIELDS[model]: Coalesce(
+            actual_count(model), 0, output_field=IntegerField()
+        )
+    })
+
+
+def apply_deltas(deltas):
+    """Применяет изменения счётчиков вида {(recipe_id, поле): дельта}
+    одним UPDATE на группу рецептов с одинаковыми дельтами."""
+    by_recipe = defaultdict(dict)
+    for (recipe_id, field), delta in deltas.items():
+        if delta:
+            by_recipe[recipe_id][field] = delta
+
+    by_deltas = defaultdict(list)
+    for recipe_id, fields in by_recipe.items():
+        by_deltas[tuple(sorted(fields.items()))].append(recipe_id)
+
+    for fields, recipe_ids in by_deltas.items():
+        Recipe.objects.filter(pk__in=recipe_ids).update(**{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in fields
+        })
+
+
+class CounterBuffer:
+    """Накапливает изменения счётчиков в памяти процесса.
+
+    Популярный рецепт получает одно обновление строки за интервал
+    вместо одного на каждое добавление в избранное. Буфер сбрасывается
+    при flush_size рецептах и фоновым потоком раз в flush_interval
+    секунд, даже если новых изменений нет. Если запись не удалась,
+    изменения возвращаются в буфер до следующего сброса. Несброшенные
+    изменения теряются, если процесс убит (SIGKILL, нехватка памяти):
+    atexit в этом случае не вызывается, расхождение исправляет
+    manage.py reconcile_counters.
+    """
+
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._deltas = defaultdict(int)
+        self._timer = None
+
+    def add(self, recipe_id, field, delta):
+        with self._lock:
+            self._deltas[(recipe_id, field)] += delta
+            due = len(self._deltas) >= self.flush_size
+            # Поток запускается при первом изменении в процессе: потоки
+            # мастера gunicorn не переживают fork
+            if self._timer is None or not self._timer.is_alive():
+                self._timer = threading.Thread(target=self._run,
+                                               daemon=True)
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Пишет накопленные изменения; при ошибке БД оставляет их в
+        буфере и не пробрасывает её: сброс идёт в фоне или в on_commit
+        чужого запроса."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(int)
+        if not deltas:
+            return
+        try:
+            apply_deltas(deltas)
+        except DatabaseError:
+            logger.exception('Счётчики не записаны, повтор при следующем '
+                             'сбросе')
+            with self._lock:
+                for key, delta in deltas.items():
+                    self._deltas[key] += delta
+
+
+buffer = CounterBuffer(
+    settings.RECIPE_COUNTERS_FLUSH_INTERVAL,
+    settings.RECIPE_COUNTERS_FLUSH_SIZE
+)
+atexit.register(buffer.flush)
+
+
+def change(model, recipe_ids, delta):
+    """Изменяет счётчик модели model у рецептов recipe_ids на delta.
+
+    Без отложенной записи обновление выполняется в текущей транзакции,
+    иначе попадает в буфер после её фиксации.
+    """
+    field = COUNTER_FIELDS[model]
+    if not settings.RECIPE_COUNTERS_WRITE_BEHIND:
+        apply_deltas({(recipe_id, field): delta for recipe_id in recipe_ids})
+        return
+
+    def add_to_buffer():
+        for recipe_id in recipe_ids:
+            buffer.add(recipe_id, field, delta)
+
+    transaction.on_commit(add_to_buffer)
@@ -0,0 +1,183 @@
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from foodgram.caching import cached
+from recipes.models import FeedItem, Recipe
+from users.models import Subscription
+
+PULL_AUTHORS_KEY = 'feed:pull_authors'
+# Прошлый набор без срока хранения: по нему видно, кто из авторов
+# вернулся к раскладке по лентам
+PREVIOUS_PULL_AUTHORS_KEY = 'feed:pull_authors:previous'
+
+
+def pull_authors():
+    """Авторы, чьи рецепты не раскладываются по лентам подписчиков,
+    а читаются при запросе ленты: у них слишком много подписчиков."""
+    return cached(
+        PULL_AUTHORS_KEY,
+        _load_pull_authors,
+        settings.FEED_PULL_AUTHORS_CACHE_TIMEOUT,
+        name='feed_pull_authors'
+    )
+
+
+def _load_pull_authors():
+    authors = frozenset(
+        Subscription.objects.values('author').annotate(
+            followers=Count('pk')
+        ).filter(
+            followers__gte=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('author', flat=True)
+    )
+    # Рецепты, опубликованные, пока автор читался при запросе, не
+    # разложены по лентам: после возврата к раскладке их бы не стало
+    previous = cache.get(PREVIOUS_PULL_AUTHORS_KEY)
+    for author_id in (previous or frozenset()) - authors:
+        _fill(author_id, Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True))
+    transaction.on_commit(
+        lambda: cache.set(PREVIOUS_PULL_AUTHORS_KEY, authors, None)
+    )
+    return authors
+
+
+def _is_pull_author(author_id):
+    # Тот же источник, что и при чтении ленты: по живому счётчику автор,
+    # только что перешедший порог, выпадал бы из ленты до истечения кэша
+    # pull_authors() — рецепты уже не раскладываются, но ещё не читаются.
+    return author_id in pull_authors()
+
+
+def push(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if _is_pull_author(recipe.author_id):
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id,
+                  author_id=recipe.author_id,
+                  recipe=recipe,
+                  pub_date=recipe.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if _is_pull_author(author_id):
+        return
+    _fill(author_id, (user_id,))
+
+
+def _fill(author_id, user_ids):
+    """Раскладывает последние рецепты автора по лентам user_ids."""
+    recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id,
+                  author_id=author_id,
+                  recipe_id=recipe_id,
+                  pub_date=pub_date)
+         for user_id in user_ids
+         for recipe_id, pub_date in recipes),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove(user_id, *author_ids):
+    FeedItem.objects.filter(
+        user_id=user_id,
+        author_id__in=author_ids
+    ).delete()
+
+
+def encode_cursor(pub_date, recipe_id):
+    return base64.urlsafe_b64encode(
+        f'{pub_date.isoformat()}|{recipe_id}'.encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор в (дата, id рецепта), ValueError — если он
+    повреждён."""
+    try:
+        pub_date, recipe_id = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except (UnicodeError, ValueError, TypeError) as error:
+        raise ValueError('Некорректный курсор') from error
+
+
+def _before(cursor, date_field, id_field):
+    if cursor is None:
+        return Q()
+    pub_date, recipe_id = cursor
+    return (
+        Q(**{f'{date_field}__lt': pub_date})
+        | Q(**{date_field: pub_date, f'{id_field}__lt': recipe_id})
+    )
+
+
+def read(user_id, cursor, limit):
+    """Страница ленты: список (id рецепта, дата) и курсор следующей
+    страницы или None.
+
+    Разложенные заранее рецепты сливаются с рецептами популярных
+    авторов, прочитанными по ключу (дата, id).
+    """
+    pushed = FeedItem.objects.filter(
+        _before(cursor, 'pub_date', 'recipe_id'),
+        user_id=user_id
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'recipe_id',
+        'pub_date'
+    )[:limit + 1]
+
+    sources = [pushed]
+    authors = pull_authors()
+    if authors:
+        followed = Subscription.objects.filter(
+            user_id=user_id,
+            author_id__in=authors
+        ).values('author_id')
+        sources.append(
+            Recipe.objects.filter(
+                _before(cursor, 'pub_date', 'pk'),
+                author_id__in=followed
+            ).exclude(
+                pk__in=FeedItem.objects.filter(
+                    user_id=user_id
+                ).values('recipe_id')
+            ).order_by('-pub_date', '-pk').values_list(
+                'pk',
+                'pub_date'
+            )[:limit + 1]
+        )
+
+    page = list(islice(heapq.merge(
+        *(list(source) for source in sources),
+        key=lambda item: (item[1], item[0]),
+        reverse=True
+    ), limit + 1))
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0])
+    return page, next_cursor
@@ -0,0 +1,68 @@
+import logging
+
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Индексы, которые нельзя описать в Meta.indexes. IngredientFilter и
+# поиск пользователей ищут по началу строки через istartswith: на
+# PostgreSQL это UPPER(name) LIKE 'X%' по индексам *_upper_idx из
+# Meta.indexes, а на SQLite — LIKE, который без учёта регистра
+# использует только индекс NOCASE.
+NOCASE_COLUMNS = (
+    ('ingredient_name', 'recipes_ingredient', 'name'),
+    ('user_username', 'users_user', 'username'),
+    ('user_first_name', 'users_user', 'first_name'),
+    ('user_last_name', 'users_user', 'last_name'),
+)
+# Расширение нужно индексу ingredient_upper_trgm_idx ещё до миграций
+EXTENSIONS = {
+    'postgresql': ('CREATE EXTENSION IF NOT EXISTS pg_trgm',),
+}
+VENDOR_INDEXES = {
+    'postgresql': (
+        # Индексы прежних версий, созданные в обход миграций; теперь
+        # они описаны в Meta.indexes под другими именами
+        *(f'DROP INDEX IF EXISTS {name}_prefix_idx'
+          for name, table, column in NOCASE_COLUMNS),
+        'DROP INDEX IF EXISTS ingredient_name_trgm_idx',
+    ),
+    'sqlite': (
+        *(f'DROP INDEX IF EXISTS {name}_prefix_idx'
+          for name, table, column in NOCASE_COLUMNS),
+        *(f'CREATE INDEX IF NOT EXISTS {name}_nocase_idx '
+          f'ON {table} ({column} COLLATE NOCASE)'
+          for name, table, column in NOCASE_COLUMNS),
+    ),
+}
+
+
+def _execute(using, statements):
+    """Выполняет statements в БД using. Без прав (например, на
+    CREATE EXTENSION) останавливается с предупреждением: следующие
+    команды зависят от предыдущих."""
+    connection = connections[using]
+    for sql in statements.get(connection.vendor, ()):
+        try:
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
+        except DatabaseError as error:
+            logger.warning('Не выполнено: %s (%s)', sql, error)
+            return
+
+
+def create_extensions(using):
+    _execute(using, EXTENSIONS)
+
+
+def create_vendor_indexes(using):
+    _execute(using, VENDOR_INDEXES)
+
+
+def extensions_handler(sender, using, **kwargs):
+    create_extensions(using)
+
+
+def vendor_indexes_handler(sender, using, **kwargs):
+    create_vendor_indexes(using)
@@ -0,0 +1,156 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from recipes.models import Change, IngredientInRecipe
+from recipes.sync import is_pruned, journal_bounds
+
+
+class IngredientIndex:
+    """Инвертированный индекс «ингредиент → рецепты».
+
+    Списки рецептов хранятся отсортированными массивами. Индекс строится
+    в памяти процесса при первом запросе, а затем догоняет изменения
+    рецептов по журналу Change в БД, общему для всех процессов:
+    пересчитываются только изменённые рецепты, полная перестройка нужна,
+    если изменений слишком много или журнал уже очищен.
+
+    Состояние индекса заменяется целиком, поэтому поиск читает его без
+    блокировки. Обновляет индекс один поток, остальные тем временем ищут
+    по предыдущему состоянию.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (списки рецептов, ингредиенты рецептов, номер журнала)
+        self._state = None
+
+    @staticmethod
+    def _build():
+        # Номер журнала берётся до чтения: изменения во время построения
+        # будут применены повторно при следующей синхронизации
+        version = journal_bounds()[1]
+        recipes = defaultdict(list)
+        rows = IngredientInRecipe.objects.order_by().values_list(
+            'recipe_id',
+            'ingredient_id'
+        ).iterator(chunk_size=settings.INGREDIENT_INDEX_CHUNK_SIZE)
+        for recipe_id, ingredient_id in rows:
+            recipes[recipe_id].append(ingredient_id)
+
+        postings = defaultdict(list)
+        for recipe_id in sorted(recipes):
+            for ingredient_id in recipes[recipe_id]:
+                postings[ingredient_id].append(recipe_id)
+
+        return (
+            {
+                ingredient_id: array('q', recipe_ids)
+                for ingredient_id, recipe_ids in postings.items()
+            },
+            {
+                recipe_id: tuple(ingredient_ids)
+                for recipe_id, ingredient_ids in recipes.items()
+            },
+            version
+        )
+
+    @staticmethod
+    def _reload(state, recipe_ids, version):
+        """Новое состояние с перечитанными рецептами recipe_ids; списки
+        рецептов копируются только у затронутых ингредиентов."""
+        postings, recipes = dict(state[0]), dict(state[1])
+        changed = {}
+
+        def posting(ingredient_id):
+            if ingredient_id not in changed:
+                changed[ingredient_id] = array(
+                    'q', postings.get(ingredient_id, ())
+                )
+            return changed[ingredient_id]
+
+        for recipe_id in recipe_ids:
+            for ingredient_id in recipes.pop(recipe_id, ()):
+                recipe_ids_list = posting(ingredient_id)
+                position = bisect_left(recipe_ids_list, recipe_id)
+                if (position < len(recipe_ids_list)
+                        and recipe_ids_list[position] == recipe_id):
+                    del recipe_ids_list[position]
+
+        reloaded = defaultdict(list)
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            reloaded[recipe_id].append(ingredient_id)
+
+        for recipe_id, ingredient_ids in reloaded.items():
+            recipes[recipe_id] = tuple(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                insort(posting(ingredient_id), recipe_id)
+
+        postings.update(changed)
+        return postings, recipes, version
+
+    def _sync(self, state):
+        if state is None:
+            return self._build()
+
+        first, version = journal_bounds()
+        if version == state[2]:
+            return state
+        if is_pruned(state[2], first):
+            return self._build()
+
+        recipe_ids = set(Change.objects.filter(
+            kind=Change.RECIPE,
+            user=None,
+            seq__gt=state[2],
+            seq__lte=version
+        ).values_list('object_id', flat=True)[
+            :settings.INGREDIENT_INDEX_MAX_PENDING + 1
+        ])
+        if len(recipe_ids) > settings.INGREDIENT_INDEX_MAX_PENDING:
+            return self._build()
+        return self._reload(state, recipe_ids, version)
+
+    def _current(self):
+        if self._state is None:
+            # Без индекса искать не по чему: ждём первое построение
+            with self._lock:
+                if self._state is None:
+                    self._state = self._build()
+                return self._state
+        if self._lock.acquire(blocking=False):
+            try:
+                self._state = self._sync(self._state)
+            finally:
+                self._lock.release()
+        return self._state
+
+    def search(self, ingredient_ids):
+        """Рецепты, в которых есть хотя бы один из ингредиентов.
+
+        Возвращает список (recipe_id, найдено, всего) по убыванию доли
+        имеющихся ингредиентов, затем по возрастанию недостающих.
+        """
+        postings, recipes, _ = self._current()
+        matched = Counter()
+        for ingredient_id in ingredient_ids:
+            matched.update(postings.get(ingredient_id, ()))
+        ranked = sorted(
+            (-found / len(recipes[recipe_id]),
+             len(recipes[recipe_id]) - found,
+             -recipe_id,
+             found)
+            for recipe_id, found in matched.items()
+        )
+        return [
+            (-negative_id, found, found + missing)
+            for coverage, missing, negative_id, found in ranked
+        ]
+
+
+ingredient_index = IngredientIndex()
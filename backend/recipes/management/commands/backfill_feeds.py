@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+from recipes.models import FeedItem
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок из текущих подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            type=int,
+                            action='append',
+                            dest='users',
+                            help='id пользователя, можно указать несколько '
+                                 'раз; по умолчанию все подписчики')
+
+    def handle(self, *args, **options):
+        subscriptions = Subscription.objects.order_by('user_id')
+        if options['users']:
+            subscriptions = subscriptions.filter(user_id__in=options['users'])
+            FeedItem.objects.filter(user_id__in=options['users']).delete()
+
+        current_user = None
+        users = 0
+        for user_id, author_id in subscriptions.values_list(
+            'user_id',
+            'author_id'
+        ).iterator():
+            if user_id != current_user:
+                current_user = user_id
+                users += 1
+                FeedItem.objects.filter(user_id=user_id).delete()
+            feed.backfill(user_id, author_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны: {users}'
+        ))
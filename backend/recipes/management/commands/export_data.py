@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes import transfer
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка данных в файл JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки')
+        parser.add_argument('--chunk-size',
+                            type=int,
+                            default=settings.DATA_TRANSFER_CHUNK_SIZE,
+                            help='Сколько строк читать из БД за раз')
+        parser.add_argument('--resume',
+                            action='store_true',
+                            help='Продолжить прерванную выгрузку; '
+                                 'продолжение читает уже другой снимок '
+                                 'данных')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint_path = f'{path}.checkpoint'
+        chunk_size = options['chunk_size']
+        checkpoint = None
+        if options['resume']:
+            checkpoint = transfer.read_checkpoint(checkpoint_path)
+            if checkpoint is None:
+                raise CommandError(f'Нет контрольной точки {checkpoint_path}')
+
+        mode = 'r+b' if checkpoint else 'wb'
+        # Один снимок данных на запуск: выгрузка согласована, пока её не
+        # прервали. Продолжение с --resume читает новый снимок, и строки,
+        # изменённые между запусками, могут не сойтись
+        with open(path, mode) as file, transaction.atomic():
+            transfer.set_snapshot()
+            if checkpoint:
+                # Строки после контрольной точки могли записаться частично
+                file.truncate(checkpoint['offset'])
+                file.seek(checkpoint['offset'])
+            models = transfer.get_models()
+            if checkpoint:
+                labels = [model._meta.label_lower for model in models]
+                models = models[labels.index(checkpoint['model']):]
+
+            for model in models:
+                label = model._meta.label_lower
+                after_pk = None
+                if checkpoint and checkpoint['model'] == label:
+                    after_pk = checkpoint['pk']
+                rows = 0
+                for pk, line in transfer.dump(model, after_pk, chunk_size):
+                    file.write(line.encode() + b'\n')
+                    rows += 1
+                    if rows % chunk_size == 0:
+                        file.flush()
+                        transfer.write_checkpoint(checkpoint_path, {
+                            'model': label,
+                            'pk': pk,
+                            'offset': file.tell(),
+                        })
+                self.stdout.write(f'{label}: {rows}')
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS('Данные выгружены!'))
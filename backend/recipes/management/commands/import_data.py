@@ -0,0 +1,101 @@
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from foodgram.caching import invalidate
+from recipes import transfer
+from recipes.models import Change
+from recipes.sync import sequence_changes
+
+
+class Command(BaseCommand):
+    help = 'Загрузка выгрузки export_data с сохранением id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки')
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=settings.DATA_TRANSFER_CHUNK_SIZE,
+                            help='Сколько строк вставлять одним запросом')
+        parser.add_argument('--resume',
+                            action='store_true',
+                            help='Продолжить прерванную загрузку')
+        parser.add_argument('--rebuild',
+                            action='store_true',
+                            help='Пересчитать ленты подписок и похожие '
+                                 'рецепты после загрузки')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint_path = f'{path}.checkpoint'
+        offset = rows = skipped = 0
+        models = transfer.get_models()
+        if options['resume']:
+            checkpoint = transfer.read_checkpoint(checkpoint_path)
+            if checkpoint is None:
+                raise CommandError(f'Нет контрольной точки {checkpoint_path}')
+            offset, rows = checkpoint['offset'], checkpoint['rows']
+            skipped = checkpoint.get('skipped', 0)
+        else:
+            # Строки с совпавшими id пропускаются, и в непустой базе
+            # выгрузка смешалась бы с чужими данными
+            filled = [model._meta.label for model in models
+                      if model.objects.exists()]
+            if filled:
+                raise CommandError(
+                    f'База не пуста ({", ".join(filled)}): загрузка '
+                    f'возможна только в пустую базу или с --resume'
+                )
+
+        batch = []
+
+        def flush():
+            nonlocal rows, skipped
+            with transaction.atomic():
+                # Строки с уже существующими id (в том числе вставленные
+                # до сбоя между вставкой и контрольной точкой)
+                # пропускаются
+                inserted = transfer.insert(batch)
+                Change.objects.bulk_create(transfer.journal(inserted))
+                transaction.on_commit(sequence_changes)
+            rows += len(inserted)
+            skipped += len(batch) - len(inserted)
+            batch.clear()
+            transfer.write_checkpoint(checkpoint_path, {
+                'offset': offset,
+                'rows': rows,
+                'skipped': skipped,
+            })
+
+        with open(path, 'rb') as file, transfer.keep_timestamps(models):
+            file.seek(offset)
+            for line in file:
+                if not line.strip():
+                    offset += len(line)
+                    continue
+                instance = transfer.load(line)
+                if batch and (instance._meta.model is not batch[0]._meta.model
+                              or len(batch) >= options['batch_size']):
+                    flush()
+                batch.append(instance)
+                offset += len(line)
+            if batch:
+                flush()
+
+        transfer.reset_sequences(models)
+        # Счётчики выгружены вместе с рецептами, а часть строк избранного
+        # и списков покупок могла быть пропущена
+        call_command('reconcile_counters', stdout=self.stdout)
+        for namespace in ('tags', 'ingredients', 'recipe_list'):
+            invalidate(namespace)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        if options['rebuild']:
+            call_command('backfill_feeds', stdout=self.stdout)
+            call_command('rebuild_similarity', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {rows}, пропущено: {skipped}'
+        ))
@@ -2,8 +2,10 @@ import csv
 import os
 
 from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
+from foodgram.caching import invalidate
 from recipes.models import Ingredient
 
 
@@ -17,6 +19,9 @@ class Command(BaseCommand):
                             nargs='?',
                             type=str,
                             help='Путь к CSV файлу')
+        parser.add_argument('--warm-caches',
+                            action='store_true',
+                            help='Прогреть кэши после загрузки')
 
     def handle(self, *args, **options):
         file_path = options.get('file_path')
@@ -27,6 +32,10 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'Ошибка при импорте: {err}'))
         else:
             self.stdout.write(self.style.SUCCESS('Данные загружены!'))
+            # bulk_create не отправляет сигналы, кэш сбрасывается явно
+            invalidate('ingredients')
+            if options['warm_caches']:
+                call_command('warm_caches', stdout=self.stdout)
 
     def _import_data(self, file_name=file_path, encoding='UTF-8'):
         with open(file_name, encoding=encoding) as file:
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Change
+
+
+class Command(BaseCommand):
+    help = 'Удаление старых записей журнала изменений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days',
+                            type=int,
+                            default=settings.SYNC_LOG_RETENTION_DAYS,
+                            help='Сколько дней хранить записи')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = Change.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала: {deleted}'
+        ))
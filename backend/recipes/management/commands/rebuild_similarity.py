@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import similarity
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Перестроение MinHash-сигнатур и LSH-корзин всех рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Количество процессов для расчёта')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Количество рецептов в одной порции')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        chunk_size = options['chunk_size']
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+        # spawn: дочерние процессы не наследуют соединение с БД
+        executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        )
+        # Каждая порция заменяется в своей транзакции: похожие рецепты
+        # ищутся по старым сигнатурам, пока порция не пересчитана, и
+        # перестроение не держит блокировки всех таблиц до конца
+        with executor:
+            pending = []
+            for start in range(0, len(recipe_ids), chunk_size):
+                chunk = recipe_ids[start:start + chunk_size]
+                pending.append(
+                    executor.submit(similarity.compute, self._load(chunk))
+                )
+                if len(pending) >= workers * 2:
+                    self._save(pending.pop(0).result())
+            for future in pending:
+                self._save(future.result())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Сигнатуры пересчитаны: {len(recipe_ids)}'
+        ))
+
+    @staticmethod
+    @transaction.atomic
+    def _save(computed):
+        similarity.save(computed)
+
+    @staticmethod
+    def _load(recipe_ids):
+        tokens = similarity.recipe_tokens(recipe_ids)
+        return [(recipe_id, tokens[recipe_id]) for recipe_id in recipe_ids]
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import IntegerField, Q
+from django.db.models.functions import Coalesce
+
+from recipes.counters import COUNTER_FIELDS, actual_count
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Сверка счётчиков популярности рецептов с реальными данными'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество рецептов в одном UPDATE')
+
+    def handle(self, *args, **options):
+        actual = {
+            field: actual_count(model)
+            for model, field in COUNTER_FIELDS.items()
+        }
+        drift = Q()
+        for field in actual:
+            drift |= ~Q(**{field: Coalesce(
+                f'actual_{field}', 0, output_field=IntegerField()
+            )})
+        drifted_ids = list(
+            Recipe.objects.annotate(**{
+                f'actual_{field}': count for field, count in actual.items()
+            }).filter(drift).values_list('pk', flat=True)
+        )
+
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted_ids), batch_size):
+            with transaction.atomic():
+                Recipe.objects.filter(
+                    pk__in=drifted_ids[start:start + batch_size]
+                ).update(**{
+                    field: Coalesce(count, 0, output_field=IntegerField())
+                    for field, count in actual.items()
+                })
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {len(drifted_ids)}'
+        ))
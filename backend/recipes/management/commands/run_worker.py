@@ -0,0 +1,62 @@
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from foodgram.metrics import registry
+from recipes import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Выполнение отложенных действий из outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',
+                            type=int,
+                            default=settings.OUTBOX_BATCH_SIZE,
+                            help='Сколько сообщений забирать за раз')
+        parser.add_argument('--threads',
+                            type=int,
+                            default=settings.OUTBOX_THREADS,
+                            help='Сколько сообщений выполнять одновременно')
+        parser.add_argument('--once',
+                            action='store_true',
+                            help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        if not settings.OUTBOX_ENABLED:
+            # Сервер выполняет действия сам, в outbox ничего не попадёт
+            logger.warning('OUTBOX_ENABLED выключен: очередь будет пустой')
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stopping.set())
+
+        processed = 0
+        with ThreadPoolExecutor(options['threads']) as executor:
+            while not stopping.is_set():
+                # Как между запросами: соединение старше CONN_MAX_AGE или
+                # оборванное (перезапуск БД) заменяется новым
+                close_old_connections()
+                try:
+                    count = outbox.drain(executor, options['batch_size'])
+                except DatabaseError:
+                    logger.exception('Ошибка при выборке из outbox')
+                    count = 0
+                processed += count
+                registry.flush_if_due()
+                if count:
+                    continue
+                if options['once']:
+                    break
+                stopping.wait(settings.OUTBOX_POLL_INTERVAL)
+
+        registry.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено действий: {processed}'
+        ))
@@ -1,13 +1,17 @@
 import re
 
 from django.conf import settings
+from django.contrib.postgres.indexes import OpClass
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
     RegexValidator
 )
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
+from foodgram.indexes import PostgresOnlyIndex, TrigramIndex
 from users.models import User
 
 
@@ -33,6 +37,10 @@ class Tag(models.Model):
         unique=True,
         max_length=settings.FIELD_DATA_MAX_LENGTH
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -52,6 +60,10 @@ class Ingredient(models.Model):
         'Единица измерения',
         max_length=settings.FIELD_DATA_MAX_LENGTH
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -61,6 +73,19 @@ class Ingredient(models.Model):
             fields=('name', 'measurement_unit'),
             name='unique_ingredient'
         )]
+        # Поиск по началу названия (istartswith) на PostgreSQL —
+        # UPPER(name) LIKE 'X%', по подстроке (icontains) в админке —
+        # по триграммам
+        indexes = [
+            PostgresOnlyIndex(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_upper_idx'
+            ),
+            TrigramIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_upper_trgm_idx'
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -74,7 +99,8 @@ class Recipe(models.Model):
         User,
         related_name='recipes',
         on_delete=models.CASCADE,
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     name = models.CharField(
         'Название',
@@ -90,6 +116,7 @@ class Recipe(models.Model):
     )
     tags = models.ManyToManyField(
         Tag,
+        through='TagInRecipe',
         verbose_name='Теги'
     )
     cooking_time = models.PositiveSmallIntegerField(
@@ -111,11 +138,39 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлено в избранное',
+        default=0,
+        editable=False
+    )
+    in_cart_count = models.PositiveIntegerField(
+        'Добавлено в списки покупок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('-pub_date',),
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_date_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-in_cart_count', '-pub_date'),
+                name='recipe_popular_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:settings.TRUNCATE_CHARS_LENGTH]
@@ -162,6 +217,39 @@ class IngredientInRecipe(models.Model):
         return f'{self.recipe.name} - {self.ingredient.name}'
 
 
+class TagInRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='recipe_tag',
+        verbose_name='Рецепт',
+        db_index=False
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='recipe_tag',
+        verbose_name='Тег',
+        db_index=False
+    )
+
+    class Meta:
+        db_table = 'recipes_recipe_tags'
+        verbose_name = 'Тег рецепта'
+        verbose_name_plural = 'Теги рецепта'
+        constraints = [models.UniqueConstraint(
+            fields=('recipe', 'tag'),
+            name='unique_tag_in_recipe'
+        )]
+        indexes = [models.Index(
+            fields=('tag', 'recipe'),
+            name='tag_in_recipe_tag_idx'
+        )]
+
+    def __str__(self):
+        return f'{self.recipe_id} - {self.tag_id}'
+
+
 class BaseShoppingCartdFavorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -184,6 +272,24 @@ class BaseShoppingCartdFavorite(models.Model):
 
 
 class ShoppingCart(BaseShoppingCartdFavorite):
+    multiplier = models.DecimalField(
+        'Множитель количества',
+        max_digits=5,
+        decimal_places=2,
+        default=1,
+        validators=[
+            MinValueValidator(
+                settings.MIN_CART_MULTIPLIER,
+                message=(f'Минимальный множитель '
+                         f'{settings.MIN_CART_MULTIPLIER}')
+            ),
+            MaxValueValidator(
+                settings.MAX_CART_MULTIPLIER,
+                message=(f'Максимальный множитель '
+                         f'{settings.MAX_CART_MULTIPLIER}')
+            )
+        ])
+
     class Meta(BaseShoppingCartdFavorite.Meta):
         default_related_name = 'shopping_carts'
         verbose_name = 'Список покупок'
@@ -201,3 +307,189 @@ class Favorite(BaseShoppingCartdFavorite):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe.name} в избранное'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура набора ингредиентов и тегов рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт'
+    )
+    minhash = models.BinaryField('MinHash-сигнатура')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура рецепта {self.recipe_id}'
+
+
+class RecipeBucket(models.Model):
+    """LSH-корзина полосы MinHash-сигнатуры рецепта."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+        verbose_name='Рецепт'
+    )
+    bucket = models.BigIntegerField('Корзина', db_index=True)
+
+    class Meta:
+        verbose_name = 'LSH-корзина рецепта'
+        verbose_name_plural = 'LSH-корзины рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id} - {self.bucket}'
+
+
+class FeedItem(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Подписчик',
+        db_index=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+        db_index=False
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'recipe'),
+            name='unique_feed_item'
+        )]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_item_user_date_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_item_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте {self.user_id}'
+
+
+class Change(models.Model):
+    """Запись журнала изменений для синхронизации клиентов."""
+
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    SUBSCRIPTION = 'subscription'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (SUBSCRIPTION, 'Подписка'),
+    )
+
+    kind = models.CharField(
+        'Тип объекта',
+        max_length=settings.CHANGE_KIND_MAX_LENGTH,
+        choices=KINDS
+    )
+    object_id = models.PositiveBigIntegerField('id рецепта или автора')
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name='Владелец списка',
+        db_index=False
+    )
+    deleted = models.BooleanField('Удалён', default=False)
+    created_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now_add=True,
+        db_index=True
+    )
+    # Номер присваивается после фиксации транзакции (recipes.sync),
+    # поэтому номера растут в порядке фиксации, а не вставки
+    seq = models.PositiveBigIntegerField(
+        'Номер в журнале',
+        null=True,
+        editable=False,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(
+                fields=('user', 'id'),
+                name='change_user_id_idx'
+            ),
+            models.Index(
+                fields=('user', 'seq'),
+                name='change_user_seq_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class OutboxMessage(models.Model):
+    """Побочное действие записи, выполняемое manage.py run_worker.
+
+    Сообщение пишется в той же транзакции, что и данные, поэтому
+    действие выполняется тогда и только тогда, когда запись сохранена.
+    """
+
+    topic = models.CharField(
+        'Тип действия',
+        max_length=settings.OUTBOX_TOPIC_MAX_LENGTH
+    )
+    key = models.CharField(
+        'Ключ упорядочивания',
+        max_length=settings.FIELD_DATA_MAX_LENGTH,
+        blank=True
+    )
+    payload = models.JSONField('Параметры', default=dict)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    available_at = models.DateTimeField(
+        'Доступно для выполнения с',
+        default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    failed = models.BooleanField('Попытки исчерпаны', default=False)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Отложенное действие'
+        verbose_name_plural = 'Отложенные действия'
+        indexes = [models.Index(
+            fields=('available_at', 'id'),
+            condition=models.Q(failed=False),
+            name='outbox_pending_idx'
+        )]
+
+    def __str__(self):
+        return f'{self.topic} {self.payload}'
@@ -0,0 +1,206 @@
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from foodgram import metrics
+from recipes import counters, feed
+from recipes.models import OutboxMessage, Recipe
+from recipes.similarity import update_signatures
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+
+def handler(topic):
+    """Регистрирует обработчик сообщений topic.
+
+    Сообщение может быть выполнено повторно (если воркер упал после
+    обработчика) и не по порядку с сообщениями других ключей, поэтому
+    обработчики сверяются с текущим состоянием БД, а не с параметрами.
+    """
+    def register(function):
+        handlers[topic] = function
+        return function
+
+    return register
+
+
+def enqueue(topic, key='', **payload):
+    """Побочное действие записи.
+
+    С OUTBOX_ENABLED сообщение сохраняется в текущей транзакции и будет
+    выполнено manage.py run_worker после её фиксации, иначе обработчик
+    вызывается сразу. Сообщения одного key в пачке выполняются по порядку.
+    """
+    if not settings.OUTBOX_ENABLED:
+        handlers[topic](**payload)
+        return
+    OutboxMessage.objects.create(topic=topic, key=key, payload=payload)
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой: экспоненциальная, со случайным
+    разбросом, чтобы повторы после сбоя не шли одновременно."""
+    delay = min(
+        settings.OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1),
+        settings.OUTBOX_BACKOFF_MAX
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(batch_size):
+    """Забирает до batch_size готовых сообщений.
+
+    Забранные сообщения откладываются на OUTBOX_LEASE_SECONDS, поэтому
+    другие воркеры их не видят, а после падения воркера они вернутся
+    в очередь сами.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    with transaction.atomic():
+        messages = list(OutboxMessage.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            failed=False,
+            available_at__lte=now
+        ).order_by('available_at', 'id')[:batch_size])
+        OutboxMessage.objects.filter(
+            pk__in=[message.pk for message in messages]
+        ).update(
+            available_at=now + lease,
+            attempts=F('attempts') + 1
+        )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def pending():
+    """Невыполненные сообщения: число и самое раннее available_at."""
+    return OutboxMessage.objects.filter(failed=False).aggregate(
+        count=Count('pk'),
+        oldest=Min('available_at')
+    )
+
+
+def oldest_pending_age():
+    oldest = pending()['oldest']
+    if oldest is None:
+        return 0
+    return max((timezone.now() - oldest).total_seconds(), 0)
+
+
+metrics.Gauge(
+    'foodgram_outbox_pending_messages',
+    'Невыполненные отложенные действия',
+    lambda: pending()['count']
+)
+metrics.Gauge(
+    'foodgram_outbox_oldest_pending_seconds',
+    'Сколько ждёт самое старое готовое к выполнению отложенное действие',
+    oldest_pending_age
+)
+
+
+def execute(message):
+    """Выполняет сообщение и удаляет его в одной транзакции с изменениями
+    обработчика; при ошибке назначает повтор или помечает failed."""
+    metrics.outbox_lag.observe(
+        (timezone.now() - message.created_at).total_seconds(),
+        topic=message.topic
+    )
+    try:
+        with transaction.atomic():
+            handlers[message.topic](**message.payload)
+            OutboxMessage.objects.filter(pk=message.pk).delete()
+    except Exception as error:
+        failed = message.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+        logger.exception('Отложенное действие %s не выполнено', message)
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            available_at=timezone.now() + backoff(message.attempts),
+            failed=failed,
+            last_error=repr(error)
+        )
+        metrics.outbox_messages.inc(
+            topic=message.topic,
+            result='failed' if failed else 'retry'
+        )
+    else:
+        metrics.outbox_messages.inc(topic=message.topic, result='done')
+
+
+def execute_in_order(messages):
+    try:
+        for message in messages:
+            execute(message)
+    finally:
+        connections.close_all()
+
+
+def drain(executor, batch_size):
+    """Выполняет одну пачку сообщений в потоках executor; сообщения
+    одного ключа — последовательно в одном потоке. Возвращает размер
+    пачки."""
+    messages = claim(batch_size)
+    by_key = defaultdict(list)
+    for message in messages:
+        by_key[message.key or message.pk].append(message)
+    list(executor.map(execute_in_order, by_key.values()))
+    return len(messages)
+
+
+@handler('recipe.created')
+def recipe_created(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None:
+        return
+    update_signatures(recipe.id)
+    feed.push(recipe)
+
+
+@handler('recipe.updated')
+def recipe_updated(recipe_id):
+    if Recipe.objects.filter(pk=recipe_id).exists():
+        update_signatures(recipe_id)
+
+
+@handler('counters')
+def change_counters(model, recipe_ids, delta):
+    """Счётчики рецептов после изменения списка model.
+
+    В воркере счётчики пересчитываются по строкам: сообщения разных
+    рецептов и повторы выполняются не по порядку, а отложенная запись
+    (RECIPE_COUNTERS_WRITE_BEHIND) потеряла бы изменение уже удалённого
+    сообщения. Без OUTBOX_ENABLED обработчик вызывается в запросе и
+    меняет счётчики на delta, как counters.change.
+    """
+    model = apps.get_model(model)
+    if settings.OUTBOX_ENABLED:
+        counters.recount(model, recipe_ids)
+    else:
+        counters.change(model, recipe_ids, delta)
+
+
+@handler('feed.sync')
+def sync_feed(user_id, author_ids):
+    """Приводит ленту user_id в соответствие с подписками на author_ids."""
+    followed = set(Subscription.objects.filter(
+        user_id=user_id,
+        author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+    for author_id in author_ids:
+        if author_id in followed:
+            feed.backfill(user_id, author_id)
+    unfollowed = [author_id for author_id in author_ids
+                  if author_id not in followed]
+    if unfollowed:
+        feed.remove(user_id, *unfollowed)
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from recipes.models import IngredientInRecipe
+
+# Единица измерения -> (базовая единица, множитель к базовой)
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'шт': ('шт.', 1),
+    'шт.': ('шт.', 1),
+}
+# Базовая единица -> (крупная единица, с какого количества её выводить)
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def aggregate(user):
+    """Сводный список покупок пользователя: (название, единица,
+    количество) с учётом множителей рецептов в списке покупок.
+
+    Суммы по ингредиентам считаются одним запросом, приведение единиц
+    и объединение строк одного ингредиента — одним проходом.
+    """
+    rows = IngredientInRecipe.objects.filter(
+        recipe__shopping_carts__user=user
+    ).values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    ).annotate(total=Sum(ExpressionWrapper(
+        F('amount') * F('recipe__shopping_carts__multiplier'),
+        output_field=DecimalField()
+    ))).order_by('ingredient__name')
+
+    totals = {}
+    for name, unit, amount in rows:
+        unit, factor = UNITS.get(unit.strip().lower(), (unit, 1))
+        totals[name, unit] = totals.get((name, unit), 0) + amount * factor
+
+    shopping_list = []
+    for (name, unit), amount in totals.items():
+        display_unit, threshold = DISPLAY_UNITS.get(unit, (unit, None))
+        if threshold and amount >= threshold:
+            unit, amount = display_unit, amount / threshold
+        shopping_list.append((name, unit, format_amount(amount)))
+    return shopping_list
+
+
+def format_amount(amount):
+    amount = Decimal(amount).quantize(Decimal('0.01')).normalize()
+    return f'{amount:f}'
+
+
+def render(shopping_list):
+    return ''.join(
+        f'{name} {unit} - {amount}\n'
+        for name, unit, amount in shopping_list
+    )
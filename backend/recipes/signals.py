@@ -0,0 +1,164 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from foodgram.caching import invalidate
+from recipes import outbox
+from recipes.models import (Change, Favorite, Ingredient,
+                            IngredientInRecipe, Recipe, ShoppingCart, Tag)
+from recipes.sync import sequence_changes
+from users.models import Subscription, User
+
+LIST_KINDS = {
+    Favorite: Change.FAVORITE,
+    ShoppingCart: Change.SHOPPING_CART,
+}
+
+
+_collected = threading.local()
+
+
+def record_changes(kind, object_ids, user_id=None, deleted=False):
+    changes = [
+        Change(kind=kind, object_id=object_id, user_id=user_id,
+               deleted=deleted)
+        for object_id in object_ids
+    ]
+    collected = getattr(_collected, 'changes', None)
+    if collected is not None:
+        collected.extend(changes)
+        return
+    Change.objects.bulk_create(changes)
+    transaction.on_commit(sequence_changes)
+
+
+@contextmanager
+def collect_changes():
+    """Изменения, записанные внутри блока, сохраняются одним запросом
+    в конце: удаление queryset отправляет post_delete по каждой строке."""
+    if getattr(_collected, 'changes', None) is not None:
+        yield
+        return
+    _collected.changes = []
+    try:
+        yield
+        Change.objects.bulk_create(_collected.changes)
+        transaction.on_commit(sequence_changes)
+    finally:
+        _collected.changes = None
+
+
+def invalidate_on_commit(*namespaces):
+    """Сбрасывает кэши после фиксации транзакции, чтобы их не заполнили
+    заново данными до изменения."""
+    def run():
+        for namespace in namespaces:
+            invalidate(namespace)
+
+    transaction.on_commit(run)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    record_changes(Change.RECIPE, (instance.id,))
+    invalidate_on_commit('recipe_list')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record_changes(Change.RECIPE, (instance.id,), deleted=True)
+    invalidate_on_commit('recipe_list')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    invalidate_on_commit('tags', 'recipe_list')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    invalidate_on_commit('ingredients', 'recipe_list')
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    instance._recipe_ids = list(IngredientInRecipe.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    """Каскад удалил ингредиент из рецептов: они попадают в журнал,
+    по которому догоняет изменения индекс ингредиентов, а их сигнатуры
+    сходства пересчитываются."""
+    recipe_ids = getattr(instance, '_recipe_ids', ())
+    record_changes(Change.RECIPE, recipe_ids)
+    for recipe_id in recipe_ids:
+        outbox.enqueue('recipe.updated', recipe_id=recipe_id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def list_item_saved(sender, instance, **kwargs):
+    record_changes(LIST_KINDS[sender], (instance.recipe_id,), instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def list_item_deleted(sender, instance, **kwargs):
+    record_changes(
+        LIST_KINDS[sender],
+        (instance.recipe_id,),
+        instance.user_id,
+        deleted=True
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_saved(sender, instance, **kwargs):
+    record_changes(
+        Change.SUBSCRIPTION,
+        (instance.author_id,),
+        instance.user_id
+    )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    record_changes(
+        Change.SUBSCRIPTION,
+        (instance.author_id,),
+        instance.user_id,
+        deleted=True
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """Избранное и список покупок удаляемого пользователя удаляются
+    каскадом в обход api.views.change_counters: счётчики чужих рецептов
+    уменьшаются здесь, собственные рецепты удаляются вместе с ним."""
+    for model in LIST_KINDS:
+        recipe_ids = list(model.objects.filter(
+            user=instance
+        ).exclude(recipe__author=instance).values_list('recipe_id', flat=True))
+        if recipe_ids:
+            outbox.enqueue(
+                'counters',
+                model=model._meta.label,
+                recipe_ids=recipe_ids,
+                delta=-1
+            )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    # Каскад записал в журнал удаление строк этого пользователя уже после
+    # того, как удалил его записи журнала
+    Change.objects.filter(user_id=instance.id).delete()
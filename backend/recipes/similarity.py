@@ -0,0 +1,127 @@
+import random
+from array import array
+from collections import defaultdict
+from hashlib import blake2b
+
+from django.conf import settings
+
+from recipes.models import (
+    IngredientInRecipe,
+    RecipeBucket,
+    RecipeSignature,
+    TagInRecipe
+)
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_random = random.Random(20231019)
+COEFFICIENTS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(MERSENNE_PRIME))
+    for _ in range(settings.MINHASH_PERMUTATIONS)
+]
+ROWS_PER_BAND = settings.MINHASH_PERMUTATIONS // settings.MINHASH_BANDS
+
+
+def recipe_tokens(recipe_ids):
+    """Множества признаков рецептов: чётные числа — ингредиенты,
+    нечётные — теги."""
+    tokens = defaultdict(set)
+    for recipe_id, ingredient_id in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id'):
+        tokens[recipe_id].add(ingredient_id * 2)
+    for recipe_id, tag_id in TagInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag_id'):
+        tokens[recipe_id].add(tag_id * 2 + 1)
+    return tokens
+
+
+def minhash(tokens):
+    return array('I', (
+        min(((a * token + b) % MERSENNE_PRIME) & MAX_HASH
+            for token in tokens) if tokens else MAX_HASH
+        for a, b in COEFFICIENTS
+    ))
+
+
+def buckets(signature):
+    """Хеши полос сигнатуры: рецепты с совпавшей полосой — кандидаты
+    в похожие."""
+    result = []
+    for band in range(settings.MINHASH_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = blake2b(
+            band.to_bytes(2, 'little') + rows.tobytes(),
+            digest_size=8
+        ).digest()
+        result.append(int.from_bytes(digest, 'little', signed=True))
+    return result
+
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по двум сигнатурам."""
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def compute(items):
+    """Сигнатуры и корзины для списка (recipe_id, признаки).
+
+    Не обращается к БД, поэтому годится для пула процессов.
+    """
+    result = []
+    for recipe_id, tokens in items:
+        signature = minhash(tokens)
+        result.append((recipe_id, signature.tobytes(), buckets(signature)))
+    return result
+
+
+def save(computed):
+    recipe_ids = [recipe_id for recipe_id, *_ in computed]
+    RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+    RecipeSignature.objects.bulk_create(
+        RecipeSignature(recipe_id=recipe_id, minhash=signature)
+        for recipe_id, signature, _ in computed
+    )
+    RecipeBucket.objects.bulk_create(
+        (RecipeBucket(recipe_id=recipe_id, bucket=bucket)
+         for recipe_id, _, recipe_buckets in computed
+         for bucket in recipe_buckets),
+        batch_size=1000
+    )
+
+
+def update_signatures(*recipe_ids):
+    tokens = recipe_tokens(recipe_ids)
+    save(compute((recipe_id, tokens[recipe_id]) for recipe_id in recipe_ids))
+
+
+def similar_recipes(recipe_id, limit):
+    """Похожие рецепты: список (recipe_id, сходство) по убыванию сходства.
+
+    Кандидаты берутся из общих LSH-корзин, а не перебором всех рецептов.
+    """
+    stored = RecipeSignature.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('minhash', flat=True).first()
+    if stored is None:
+        # Сигнатуру сохраняет обработчик recipe.created или
+        # rebuild_similarity; запрос на чтение считает её в памяти и
+        # ничего не пишет, чтобы параллельные запросы не конфликтовали
+        signature = minhash(recipe_tokens([recipe_id])[recipe_id])
+    else:
+        signature = array('I', bytes(stored))
+
+    candidates = RecipeBucket.objects.filter(
+        bucket__in=buckets(signature)
+    ).exclude(recipe_id=recipe_id).values('recipe_id')
+    scored = [
+        (candidate_id, similarity(signature, array('I', bytes(candidate))))
+        for candidate_id, candidate in RecipeSignature.objects.filter(
+            recipe_id__in=candidates
+        ).values_list('recipe_id', 'minhash')
+    ]
+    scored.sort(key=lambda item: (-item[1], -item[0]))
+    return scored[:limit]
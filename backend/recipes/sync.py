@@ -0,0 +1,90 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max, Min, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Change
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки PostgreSQL, под которой нумеруются изменения
+SEQUENCE_LOCK_ID = 0x666f6f64
+
+
+def sequence_changes():
+    """Нумерует зафиксированные изменения без номера одним следующим
+    номером.
+
+    Вызывается после фиксации каждой пишущей транзакции, поэтому номера
+    растут в порядке фиксации: изменение не может получить номер меньше
+    уже выданного клиенту курсора, сколько бы ни длилась его транзакция.
+    Незафиксированные строки другим транзакциям не видны, а строки
+    процесса, упавшего до нумерации, пронумерует следующая запись.
+    На PostgreSQL нумерация идёт под блокировкой, SQLite выполняет
+    пишущие транзакции по одной. Ошибка только записывается в лог: данные
+    уже зафиксированы, а изменения пронумерует следующая запись.
+    """
+    try:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                                   [SEQUENCE_LOCK_ID])
+            Change.objects.filter(seq=None).update(seq=Coalesce(
+                Subquery(
+                    Change.objects.filter(seq__isnull=False)
+                    .order_by('-seq').values('seq')[:1]
+                ),
+                0
+            ) + 1)
+    except DatabaseError:
+        logger.exception('Изменения не пронумерованы')
+
+
+def current_token():
+    return Change.objects.aggregate(last=Max('seq'))['last'] or 0
+
+
+def journal_bounds():
+    """(первый, последний) номер в журнале; (None, 0) для пустого."""
+    bounds = Change.objects.aggregate(first=Min('seq'), last=Max('seq'))
+    return bounds['first'], bounds['last'] or 0
+
+
+def is_pruned(since, first):
+    """Удалены ли из журнала изменения после курсора since."""
+    return first is not None and since < first - 1
+
+
+def changes_since(user, since):
+    """Изменения после курсора since для пользователя user.
+
+    Возвращает (новый курсор, нужна ли полная перезагрузка, изменения),
+    где изменения — {тип: {id: удалён ли}} с последним состоянием
+    каждого объекта. Полная перезагрузка нужна, если журнал за этот
+    период уже очищен, курсор выдан не этим журналом или изменений
+    слишком много.
+    """
+    first, token = journal_bounds()
+    if since > token or is_pruned(since, first):
+        return token, True, {}
+
+    visible = Q(user=None)
+    if user.is_authenticated:
+        visible |= Q(user=user)
+    rows = list(
+        Change.objects.filter(visible, seq__gt=since)
+        .order_by('seq', 'id')
+        .values_list('seq', 'kind', 'object_id', 'deleted')
+        [:settings.SYNC_MAX_CHANGES + 1]
+    )
+    if len(rows) > settings.SYNC_MAX_CHANGES:
+        return current_token(), True, {}
+
+    changes = {kind: {} for kind, _ in Change.KINDS}
+    for _, kind, object_id, deleted in rows:
+        changes[kind][object_id] = deleted
+    token = rows[-1][0] if rows else since
+    return token, False, changes
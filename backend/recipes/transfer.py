@@ -0,0 +1,175 @@
+import json
+import os
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from recipes.models import Change
+# Порядок выгрузки: каждая модель ссылается только на предыдущие.
+# Производные данные (ленты, сигнатуры, журнал изменений) не выгружаются
+# и пересчитываются после загрузки, токены — чтобы не переносить
+# секреты между окружениями.
+MODELS = (
+    'users.User',
+    'recipes.Tag',
+    'recipes.Ingredient',
+    'recipes.Recipe',
+    'recipes.TagInRecipe',
+    'recipes.IngredientInRecipe',
+    'recipes.Favorite',
+    'recipes.ShoppingCart',
+    'users.Subscription',
+)
+
+
+def get_models():
+    return [apps.get_model(label) for label in MODELS]
+
+
+def data_fields(model):
+    return [field for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def set_snapshot():
+    """Читает всю текущую транзакцию из одного снимка данных.
+
+    Вызывается первым запросом в transaction.atomic(): на PostgreSQL
+    по умолчанию READ COMMITTED, и строки, изменённые во время
+    выгрузки, попали бы в неё наполовину — например, избранное рецепта,
+    выгруженного до его удаления. SQLite читает транзакцию из одного
+    снимка и так.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY'
+            )
+
+
+def dump(model, after_pk=None, chunk_size=2000):
+    """Строки модели с pk больше after_pk по возрастанию pk: пары
+    (pk, строка JSON в формате manage.py dumpdata --format jsonl).
+
+    Картинки выгружаются путями относительно MEDIA_ROOT.
+    """
+    fields = data_fields(model)
+    queryset = model._default_manager.order_by('pk').values_list(
+        'pk',
+        *(field.attname for field in fields)
+    )
+    if after_pk is not None:
+        queryset = queryset.filter(pk__gt=after_pk)
+    label = model._meta.label_lower
+    names = [field.name for field in fields]
+    for pk, *values in queryset.iterator(chunk_size=chunk_size):
+        yield pk, json.dumps(
+            {'model': label, 'pk': pk, 'fields': dict(zip(names, values))},
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False
+        )
+
+
+def load(line):
+    """Объект модели из строки выгрузки, ещё не сохранённый."""
+    data = json.loads(line)
+    model = apps.get_model(data['model'])
+    fields = {field.name: field for field in data_fields(model)}
+    values = {model._meta.pk.attname: data['pk']}
+    for name, value in data['fields'].items():
+        field = fields[name]
+        values[field.attname] = (
+            None if value is None else field.to_python(value)
+        )
+    return model(**values)
+
+
+def insert(instances):
+    """Вставляет объекты одной модели, пропуская уже существующие id.
+
+    Возвращает вставленные объекты: ignore_conflicts не сообщает, какие
+    строки пропущены, поэтому они определяются по id до и после вставки.
+    """
+    model = type(instances[0])
+    pks = [instance.pk for instance in instances]
+    existed = set(model._default_manager.filter(
+        pk__in=pks
+    ).values_list('pk', flat=True))
+    model._default_manager.bulk_create(instances, ignore_conflicts=True)
+    inserted = set(model._default_manager.filter(
+        pk__in=pks
+    ).values_list('pk', flat=True)) - existed
+    return [instance for instance in instances if instance.pk in inserted]
+
+
+def journal(instances):
+    """Записи журнала изменений для вставленных объектов одной модели,
+    как их записали бы сигналы recipes.signals: bulk_create сигналов
+    не отправляет, а без журнала загруженное не увидят синхронизация
+    клиентов и индекс ингредиентов."""
+    if not instances:
+        return []
+    label = instances[0]._meta.label
+    if label in ('recipes.Recipe', 'recipes.TagInRecipe',
+                 'recipes.IngredientInRecipe'):
+        recipe_ids = {getattr(instance, 'recipe_id', instance.pk)
+                      for instance in instances}
+        return [Change(kind=Change.RECIPE, object_id=recipe_id)
+                for recipe_id in sorted(recipe_ids)]
+    kinds = {
+        'recipes.Favorite': Change.FAVORITE,
+        'recipes.ShoppingCart': Change.SHOPPING_CART,
+    }
+    if label in kinds:
+        return [Change(kind=kinds[label], object_id=instance.recipe_id,
+                       user_id=instance.user_id)
+                for instance in instances]
+    if label == 'users.Subscription':
+        return [Change(kind=Change.SUBSCRIPTION, object_id=instance.author_id,
+                       user_id=instance.user_id)
+                for instance in instances]
+    return []
+
+
+@contextmanager
+def keep_timestamps(models):
+    """Отключает auto_now и auto_now_add, чтобы при вставке сохранились
+    даты из выгрузки."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def reset_sequences(models):
+    """Сдвигает счётчики id после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding='UTF-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    with open(path + '.tmp', 'w', encoding='UTF-8') as file:
+        json.dump(state, file)
+    os.replace(path + '.tmp', path)
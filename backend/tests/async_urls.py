@@ -0,0 +1,10 @@
+"""Адреса API с асинхронными представлениями, как при
+ASYNC_READ_API=True."""
+from django.urls import include, path
+
+from api import async_urls
+
+urlpatterns = [
+    path('api/', include(async_urls.urlpatterns)),
+    path('', include('foodgram.urls')),
+]
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Favorite, ShoppingCart
+from tests import factories
+
+
+class APITestCase(TestCase):
+    """Общий набор данных для тестов API.
+
+    user подписан на author и other_author, у него есть свои рецепты,
+    избранное и список покупок; stranger ни на кого не подписан.
+    """
+
+    recipes_count = 24
+
+    @classmethod
+    def setUpTestData(cls):
+        (cls.user, cls.author,
+         cls.other_author, cls.stranger) = factories.create_users(4)
+        cls.tags = factories.create_tags(3)
+        cls.ingredients = factories.create_ingredients(20)
+        cls.recipes = factories.create_recipes(
+            [cls.author, cls.other_author, cls.user],
+            cls.tags,
+            cls.ingredients,
+            cls.recipes_count
+        )
+        cls.recipe = cls.recipes[0]
+        cls.own_recipe = cls.recipes[2]
+        factories.add_to_list(Favorite, cls.user, cls.recipes[:5])
+        factories.add_to_list(ShoppingCart, cls.user, cls.recipes[:3])
+        factories.subscribe(cls.user, [cls.author, cls.other_author])
+
+    def setUp(self):
+        # Кэши и индекс ингредиентов живут дольше транзакции теста
+        cache.clear()
+        ingredient_index._state = None
+        self.anon = APIClient()
+        self.client = self.client_for(self.user)
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {user.token}')
+        return client
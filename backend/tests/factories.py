@@ -0,0 +1,140 @@
+"""Фабрики тестовых данных.
+
+Объекты создаются пачками через bulk_create, поэтому сигналы не
+срабатывают: производные данные (счётчики, ленты подписок, сигнатуры
+похожих рецептов) фабрики пересчитывают сами.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+from itertools import count
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes import feed, transfer
+from recipes.counters import COUNTER_FIELDS, apply_deltas
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    Tag,
+    TagInRecipe
+)
+from recipes.similarity import update_signatures
+from users.models import Subscription, User
+
+PASSWORD = 'Secret-password-42'
+IMAGE = 'recipes/images/test.png'
+# PNG 1x1 для полей Base64ImageField
+IMAGE_BASE64 = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+sequence = count(1)
+
+
+def create_users(number, password=PASSWORD):
+    """Пользователи с токенами авторизации (атрибут token)."""
+    password = make_password(password)
+    numbers = [next(sequence) for _ in range(number)]
+    User.objects.bulk_create(
+        User(
+            email=f'user{number}@example.com',
+            username=f'user{number}',
+            first_name=f'Имя{number}',
+            last_name=f'Фамилия{number}',
+            password=password
+        )
+        for number in numbers
+    )
+    users = list(User.objects.filter(
+        username__in=[f'user{number}' for number in numbers]
+    ).order_by('pk'))
+    Token.objects.bulk_create(
+        Token(key=Token.generate_key(), user=user) for user in users
+    )
+    for user in users:
+        user.token = user.auth_token.key
+    return users
+
+
+def create_tags(number):
+    numbers = [next(sequence) for _ in range(number)]
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {number}', color=f'#{number:06X}', slug=f'tag{number}')
+        for number in numbers
+    )
+    return list(Tag.objects.filter(
+        slug__in=[f'tag{number}' for number in numbers]
+    ).order_by('pk'))
+
+
+def create_ingredients(number):
+    numbers = [next(sequence) for _ in range(number)]
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}',
+                   measurement_unit=('г', 'мл', 'шт')[number % 3])
+        for number in numbers
+    )
+    return list(Ingredient.objects.filter(
+        name__in=[f'ингредиент {number}' for number in numbers]
+    ).order_by('pk'))
+
+
+def create_recipes(authors, tags, ingredients, number,
+                   tags_per_recipe=2, ingredients_per_recipe=4, seed=0):
+    """Рецепты авторов по кругу, от старых к новым с шагом в минуту,
+    со случайными тегами и ингредиентами."""
+    rng = random.Random(seed)
+    numbers = [next(sequence) for _ in range(number)]
+    start = timezone.now() - timedelta(minutes=number)
+    with transfer.keep_timestamps([Recipe]):
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[position % len(authors)],
+                name=f'Рецепт {number}',
+                image=IMAGE,
+                text=f'Описание рецепта {number}',
+                cooking_time=rng.randint(1, 120),
+                pub_date=start + timedelta(minutes=position),
+                updated_at=start + timedelta(minutes=position)
+            )
+            for position, number in enumerate(numbers)
+        )
+    recipes = list(Recipe.objects.filter(
+        name__in=[f'Рецепт {number}' for number in numbers]
+    ).order_by('pk'))
+    TagInRecipe.objects.bulk_create(
+        TagInRecipe(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in rng.sample(tags, min(tags_per_recipe, len(tags)))
+    )
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe,
+                           ingredient=ingredient,
+                           amount=rng.randint(1, 500))
+        for recipe in recipes
+        for ingredient in rng.sample(ingredients, ingredients_per_recipe)
+    )
+    update_signatures(*(recipe.id for recipe in recipes))
+    return recipes
+
+
+def add_to_list(model, user, recipes):
+    """Добавляет рецепты в избранное или список покупок пользователя."""
+    model.objects.bulk_create(
+        model(user=user, recipe=recipe) for recipe in recipes
+    )
+    field = COUNTER_FIELDS[model]
+    apply_deltas(Counter((recipe.id, field) for recipe in recipes))
+
+
+def subscribe(user, authors):
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author) for author in authors
+    )
+    for author in authors:
+        feed.backfill(user.id, author.id)
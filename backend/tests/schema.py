@@ -0,0 +1,101 @@
+"""Проверка ответов API по документации docs/openapi-schema.yml.
+
+Поддерживается подмножество OpenAPI, которое используется в документации:
+$ref, allOf, oneOf, type, properties, items, enum и nullable. Ответ
+должен содержать все описанные свойства и не содержать лишних.
+"""
+import yaml
+from django.conf import settings
+
+SCHEMA_PATH = settings.BASE_DIR.parent / 'docs' / 'openapi-schema.yml'
+METHODS = ('get', 'post', 'put', 'patch', 'delete')
+# Свойство-заглушка схемы ошибок валидации: вместо него имена полей
+ANY_FIELD = 'field_name'
+TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+
+
+class OpenAPISchema:
+
+    def __init__(self, path=SCHEMA_PATH):
+        with open(path, encoding='UTF-8') as file:
+            self.spec = yaml.safe_load(file)
+
+    def operations(self):
+        """Все документированные пары (метод, путь)."""
+        return {
+            (method, path)
+            for path, operations in self.spec['paths'].items()
+            for method in operations if method in METHODS
+        }
+
+    def resolve(self, node):
+        while '$ref' in node:
+            target = self.spec
+            for part in node['$ref'].lstrip('#/').split('/'):
+                target = target[part]
+            node = target
+        return node
+
+    def response(self, method, path, status):
+        """Описание ответа или None, если код не документирован."""
+        responses = self.spec['paths'][path][method]['responses']
+        response = responses.get(str(status))
+        return None if response is None else self.resolve(response)
+
+    def merge(self, schema):
+        """Схема с раскрытыми $ref и объединёнными частями allOf."""
+        schema = self.resolve(schema)
+        if 'allOf' not in schema:
+            return schema
+        merged = {'type': 'object', 'properties': {}}
+        for part in (*schema['allOf'], schema):
+            part = self.merge(part) if part is not schema else part
+            merged['properties'].update(part.get('properties', {}))
+        return merged
+
+    def errors(self, schema, value, where='$'):
+        """Список расхождений value со схемой."""
+        schema = self.merge(schema)
+        if 'oneOf' in schema:
+            variants = [self.errors(variant, value, where)
+                        for variant in schema['oneOf']]
+            return [] if [] in variants else min(variants, key=len)
+        if value is None:
+            if schema.get('nullable'):
+                return []
+            return [f'{where}: null']
+
+        kind = schema.get('type', 'object' if 'properties' in schema
+                          else None)
+        if kind is not None:
+            expected = TYPES[kind]
+            if (not isinstance(value, expected)
+                    or isinstance(value, bool) and kind != 'boolean'):
+                return [f'{where}: ожидался {kind}, получено {value!r}']
+        if 'enum' in schema and value not in schema['enum']:
+            return [f'{where}: {value!r} не из {schema["enum"]}']
+
+        errors = []
+        if kind == 'array' and 'items' in schema:
+            for index, item in enumerate(value):
+                errors += self.errors(schema['items'], item,
+                                      f'{where}[{index}]')
+        if kind == 'object' and 'properties' in schema:
+            properties = schema['properties']
+            if ANY_FIELD in properties:
+                return errors
+            for name in sorted(properties.keys() - value.keys()):
+                errors.append(f'{where}.{name}: нет в ответе')
+            for name in sorted(value.keys() - properties.keys()):
+                errors.append(f'{where}.{name}: нет в документации')
+            for name in sorted(properties.keys() & value.keys()):
+                errors += self.errors(properties[name], value[name],
+                                      f'{where}.{name}')
+        return errors
@@ -0,0 +1,56 @@
+"""Настройки для тестов: SQLite в памяти, без миграций и фоновых задач.
+
+Запуск: python manage.py test --settings=tests.settings --parallel
+"""
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+from foodgram.settings import REST_FRAMEWORK, config
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Миграции не хранятся в репозитории, а таблицы по моделям создаются
+# быстрее, чем применяются миграции
+MIGRATION_MODULES = {
+    label: None for label in (
+        'admin', 'auth', 'contenttypes', 'sessions', 'authtoken',
+        'users', 'recipes',
+    )
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+CACHE_BACKGROUND_REFRESH = False
+WARM_CACHES_ON_STARTUP = False
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
+
+METRICS_ENABLED = False
+PROFILING_ENABLED = False
+SLOW_QUERY_ENABLED = False
+OUTBOX_ENABLED = False
+RECIPE_COUNTERS_WRITE_BEHIND = False
+ASYNC_READ_API = False
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        scope: '100000/min'
+        for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    },
+}
+
+# Проверки времени ответа зависят от машины и выключены по умолчанию;
+# бюджеты умножаются на LATENCY_BUDGET_FACTOR
+LATENCY_CHECKS = config('LATENCY_CHECKS', default=False, cast=bool)
+LATENCY_BUDGET_FACTOR = config('LATENCY_BUDGET_FACTOR', default=1.0, cast=float)
@@ -0,0 +1,58 @@
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from api.async_views import offload
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Tag
+from tests import factories
+
+
+@override_settings(ROOT_URLCONF='tests.async_urls')
+class AsyncReadAPITest(TransactionTestCase):
+    """Асинхронные представления отвечают так же, как синхронные.
+
+    Запросы выполняются в пуле потоков со своими соединениями, поэтому
+    данные должны быть зафиксированы: здесь TransactionTestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index._state = None
+        self.tags = factories.create_tags(3)
+        self.ingredients = factories.create_ingredients(5)
+        self.client = AsyncClient()
+
+    async def test_tag_list(self):
+        response = await self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag['id'] for tag in response.json()],
+            [tag.id for tag in sorted(self.tags, key=lambda tag: tag.name)]
+        )
+
+    async def test_ingredient_search(self):
+        ingredient = self.ingredients[0]
+        # AsyncClient в Django 3.2 не переносит data в строку запроса
+        response = await self.client.get(
+            '/api/ingredients/?' + urlencode({'name': ingredient.name})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.json()],
+            [ingredient.id]
+        )
+
+    async def test_lists_are_cached(self):
+        first = await self.client.get('/api/tags/')
+        # update() не отправляет сигналы и не сбрасывает кэш
+        await offload(Tag.objects.filter(pk=self.tags[0].pk).update)(
+            name='Другое название'
+        )
+        second = await self.client.get('/api/tags/')
+        self.assertEqual(first.json(), second.json())
+
+    async def test_writes_are_rejected(self):
+        response = await self.client.post('/api/tags/')
+        self.assertEqual(response.status_code, 401)
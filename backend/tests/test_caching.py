@@ -0,0 +1,61 @@
+from django.core.cache import cache
+
+from foodgram.caching import get_version, invalidate
+from recipes.models import Recipe
+from tests.base import APITestCase
+
+
+class ListCacheTest(APITestCase):
+
+    def test_cached_list_does_not_query_database(self):
+        for url in ('/api/recipes/', '/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                first = self.anon.get(url)
+                with self.assertNumQueries(0):
+                    second = self.anon.get(url)
+                self.assertEqual(first.json(), second.json())
+
+    def test_user_dependent_list_is_not_cached(self):
+        self.client.get('/api/recipes/')
+        self.client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        response = self.client.get('/api/recipes/', {'limit': 100})
+        recipe, = (item for item in response.data['results']
+                   if item['id'] == self.recipe.id)
+        self.assertFalse(recipe['is_favorited'])
+
+    def test_recipe_change_invalidates_list(self):
+        self.anon.get('/api/recipes/')
+        recipe = Recipe.objects.get(pk=self.recipes[-1].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Переименованный рецепт'
+            recipe.save()
+        response = self.anon.get('/api/recipes/')
+        self.assertEqual(response.data['results'][0]['name'],
+                         'Переименованный рецепт')
+
+    def test_tag_change_invalidates_tags(self):
+        self.anon.get('/api/tags/')
+        tag = self.tags[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'Новый тег'
+            tag.save()
+        names = [item['name'] for item in self.anon.get('/api/tags/').data]
+        self.assertIn('Новый тег', names)
+
+    def test_cached_links_follow_request_host(self):
+        self.anon.get('/api/recipes/', HTTP_HOST='localhost')
+        with self.assertNumQueries(0):
+            response = self.anon.get('/api/recipes/',
+                                     HTTP_HOST='example.com')
+        self.assertTrue(
+            response.data['next'].startswith('http://example.com/')
+        )
+        self.assertTrue(response.data['results'][0]['image'].startswith(
+            'http://example.com/'
+        ))
+
+    def test_evicted_version_does_not_return_to_old_values(self):
+        old = get_version('tags')
+        invalidate('tags')
+        cache.delete('tags:version')
+        self.assertGreater(get_version('tags'), old + 1)
@@ -0,0 +1,56 @@
+from tests import factories
+from tests.base import APITestCase
+
+
+class ConditionalGetTest(APITestCase):
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_recipe_is_not_modified(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=self.etag(url))
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_etag_changes_with_user_lists(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.etag(url)
+        self.client.delete(f'{url}favorite/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_favorited'])
+
+    def test_recipe_etag_changes_with_ingredient(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = self.etag(url)
+        ingredient = self.recipe.ingredients.first()
+        ingredient.name = 'новое название'
+        ingredient.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.client_for(self.stranger).get(
+            url, HTTP_IF_NONE_MATCH=self.etag(url)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_subscriptions_etag_changes_with_new_recipe(self):
+        url = '/api/users/subscriptions/'
+        etag = self.etag(url)
+        factories.create_recipes(
+            [self.author], self.tags, self.ingredients, 1
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_subscriptions_etag_changes_with_author_profile(self):
+        url = '/api/users/subscriptions/'
+        etag = self.etag(url)
+        self.author.first_name = 'Новое имя'
+        self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
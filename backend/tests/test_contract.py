@@ -0,0 +1,259 @@
+import json
+from unittest import skipUnless
+
+from django.db import transaction
+
+from tests.base import APITestCase
+from tests.factories import IMAGE_BASE64, PASSWORD
+from tests.schema import SCHEMA_PATH, OpenAPISchema
+
+
+class Case:
+    """Запрос к документированной операции и ожидаемый код ответа."""
+
+    def __init__(self, method, path, status, url=None, data=None,
+                 client='client', headers=None):
+        self.method = method
+        self.path = path
+        self.status = status
+        self.url = url or path
+        self.data = data
+        self.client = client
+        self.headers = headers or {}
+
+    def __str__(self):
+        return f'{self.method.upper()} {self.url} -> {self.status}'
+
+
+@skipUnless(SCHEMA_PATH.exists(), 'нет docs/openapi-schema.yml')
+class ContractTest(APITestCase):
+    """Ответы каждой документированной операции совпадают по форме
+    с docs/openapi-schema.yml."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.schema = OpenAPISchema()
+
+    def cases(self):
+        recipe = f'/api/recipes/{self.recipe.id}/'
+        own = f'/api/recipes/{self.own_recipe.id}/'
+        fresh = f'/api/recipes/{self.recipes[10].id}/'
+        author = f'/api/users/{self.author.id}/'
+        ingredient_ids = ','.join(
+            str(ingredient.id) for ingredient in self.ingredients[:5]
+        )
+        recipe_ids = {'recipes': [self.recipes[4].id, self.recipes[10].id,
+                                  10 ** 6]}
+        recipe_data = {
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 10},
+                            {'id': self.ingredients[1].id, 'amount': 2}],
+            'tags': [self.tags[0].id],
+            'image': IMAGE_BASE64,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        return [
+            Case('get', '/api/users/', 200, client='anon'),
+            Case('post', '/api/users/', 201, client='anon', data={
+                'email': 'new@example.com', 'username': 'new_user',
+                'first_name': 'Имя', 'last_name': 'Фамилия',
+                'password': PASSWORD,
+            }),
+            Case('post', '/api/users/', 400, client='anon', data={}),
+            Case('get', '/api/users/{id}/', 200, url=author),
+            Case('get', '/api/users/{id}/', 404, url='/api/users/0/'),
+            Case('get', '/api/users/me/', 200),
+            Case('get', '/api/users/me/', 401, client='anon'),
+            Case('get', '/api/users/subscriptions/', 200),
+            Case('get', '/api/users/subscriptions/', 304,
+                 headers=self.etag('/api/users/subscriptions/')),
+            Case('get', '/api/users/subscriptions/', 401, client='anon'),
+            Case('post', '/api/users/{id}/subscribe/', 201,
+                 url=f'/api/users/{self.stranger.id}/subscribe/'),
+            Case('post', '/api/users/{id}/subscribe/', 400,
+                 url=f'{author}subscribe/'),
+            Case('post', '/api/users/{id}/subscribe/', 400,
+                 url=f'/api/users/{self.user.id}/subscribe/'),
+            Case('post', '/api/users/{id}/subscribe/', 401,
+                 url=f'{author}subscribe/', client='anon'),
+            Case('post', '/api/users/{id}/subscribe/', 404,
+                 url='/api/users/0/subscribe/'),
+            Case('delete', '/api/users/{id}/subscribe/', 204,
+                 url=f'{author}subscribe/'),
+            Case('delete', '/api/users/{id}/subscribe/', 404,
+                 url=f'/api/users/{self.stranger.id}/subscribe/'),
+            Case('delete', '/api/users/{id}/subscribe/', 401,
+                 url=f'{author}subscribe/', client='anon'),
+            Case('post', '/api/users/subscribe/', 200,
+                 data={'authors': [self.author.id, self.stranger.id]}),
+            Case('post', '/api/users/subscribe/', 400, data={}),
+            Case('delete', '/api/users/subscribe/', 200,
+                 data={'authors': [self.author.id, self.stranger.id]}),
+            Case('delete', '/api/users/subscribe/', 401, client='anon',
+                 data={'authors': [self.author.id]}),
+            Case('post', '/api/users/set_password/', 204, data={
+                'current_password': PASSWORD,
+                'new_password': 'Another-password-42',
+            }),
+            Case('post', '/api/users/set_password/', 400, data={}),
+            Case('post', '/api/auth/token/login/', 200, client='anon', data={
+                'email': self.user.email, 'password': PASSWORD,
+            }),
+            Case('post', '/api/auth/token/logout/', 204),
+            Case('post', '/api/auth/token/logout/', 401, client='anon'),
+            Case('get', '/api/tags/', 200, client='anon'),
+            Case('get', '/api/tags/{id}/', 200, client='anon',
+                 url=f'/api/tags/{self.tags[0].id}/'),
+            Case('get', '/api/tags/{id}/', 404, client='anon',
+                 url='/api/tags/0/'),
+            Case('get', '/api/ingredients/', 200, client='anon',
+                 url='/api/ingredients/?name=ингр'),
+            Case('get', '/api/ingredients/{id}/', 200, client='anon',
+                 url=f'/api/ingredients/{self.ingredients[0].id}/'),
+            Case('get', '/api/recipes/', 200, client='anon'),
+            Case('get', '/api/recipes/', 200,
+                 url=f'/api/recipes/?is_favorited=1&tags={self.tags[0].slug}'),
+            Case('post', '/api/recipes/', 201, data=recipe_data),
+            Case('post', '/api/recipes/', 400, data={}),
+            Case('post', '/api/recipes/', 401, client='anon',
+                 data=recipe_data),
+            Case('get', '/api/recipes/{id}/', 200, client='anon',
+                 url=recipe),
+            Case('get', '/api/recipes/{id}/', 304, url=recipe,
+                 headers=self.etag(recipe)),
+            Case('patch', '/api/recipes/{id}/', 200, url=own,
+                 data=recipe_data),
+            Case('patch', '/api/recipes/{id}/', 400, url=own,
+                 data={'cooking_time': 0}),
+            Case('patch', '/api/recipes/{id}/', 401, url=own,
+                 client='anon', data=recipe_data),
+            Case('patch', '/api/recipes/{id}/', 403, url=recipe,
+                 data=recipe_data),
+            Case('patch', '/api/recipes/{id}/', 404,
+                 url='/api/recipes/0/', data=recipe_data),
+            Case('delete', '/api/recipes/{id}/', 204, url=own),
+            Case('delete', '/api/recipes/{id}/', 401, url=own,
+                 client='anon'),
+            Case('delete', '/api/recipes/{id}/', 403, url=recipe),
+            Case('delete', '/api/recipes/{id}/', 404,
+                 url='/api/recipes/0/'),
+            Case('get', '/api/recipes/{id}/similar/', 200, client='anon',
+                 url=f'{recipe}similar/'),
+            Case('get', '/api/recipes/{id}/similar/', 404, client='anon',
+                 url='/api/recipes/0/similar/'),
+            Case('get', '/api/recipes/feed/', 200),
+            Case('get', '/api/recipes/feed/', 400,
+                 url='/api/recipes/feed/?cursor=bad'),
+            Case('get', '/api/recipes/feed/', 401, client='anon'),
+            Case('get', '/api/recipes/cookable/', 200, client='anon',
+                 url=f'/api/recipes/cookable/?ingredients={ingredient_ids}'),
+            Case('get', '/api/recipes/cookable/', 400, client='anon'),
+            Case('post', '/api/recipes/{id}/favorite/', 201,
+                 url=f'{fresh}favorite/'),
+            Case('post', '/api/recipes/{id}/favorite/', 400,
+                 url=f'{recipe}favorite/'),
+            Case('post', '/api/recipes/{id}/favorite/', 401,
+                 url=f'{recipe}favorite/', client='anon'),
+            Case('delete', '/api/recipes/{id}/favorite/', 204,
+                 url=f'{recipe}favorite/'),
+            Case('delete', '/api/recipes/{id}/favorite/', 404,
+                 url=f'{fresh}favorite/'),
+            Case('delete', '/api/recipes/{id}/favorite/', 401,
+                 url=f'{recipe}favorite/', client='anon'),
+            Case('post', '/api/recipes/{id}/shopping_cart/', 201,
+                 url=f'{fresh}shopping_cart/'),
+            Case('post', '/api/recipes/{id}/shopping_cart/', 400,
+                 url=f'{recipe}shopping_cart/'),
+            Case('post', '/api/recipes/{id}/shopping_cart/', 401,
+                 url=f'{recipe}shopping_cart/', client='anon'),
+            Case('patch', '/api/recipes/{id}/shopping_cart/', 200,
+                 url=f'{recipe}shopping_cart/', data={'multiplier': '1.5'}),
+            Case('patch', '/api/recipes/{id}/shopping_cart/', 400,
+                 url=f'{recipe}shopping_cart/', data={'multiplier': '0'}),
+            Case('patch', '/api/recipes/{id}/shopping_cart/', 404,
+                 url=f'{fresh}shopping_cart/', data={'multiplier': '2'}),
+            Case('delete', '/api/recipes/{id}/shopping_cart/', 204,
+                 url=f'{recipe}shopping_cart/'),
+            Case('delete', '/api/recipes/{id}/shopping_cart/', 404,
+                 url=f'{fresh}shopping_cart/'),
+            Case('delete', '/api/recipes/{id}/shopping_cart/', 401,
+                 url=f'{recipe}shopping_cart/', client='anon'),
+            Case('post', '/api/recipes/favorite/', 200, data=recipe_ids),
+            Case('post', '/api/recipes/favorite/', 400, data={}),
+            Case('post', '/api/recipes/favorite/', 401, client='anon',
+                 data=recipe_ids),
+            Case('delete', '/api/recipes/favorite/', 200, data=recipe_ids),
+            Case('delete', '/api/recipes/favorite/', 400,
+                 data={'recipes': []}),
+            Case('post', '/api/recipes/shopping_cart/', 200,
+                 data=recipe_ids),
+            Case('post', '/api/recipes/shopping_cart/', 400,
+                 data={'recipes': ['x']}),
+            Case('delete', '/api/recipes/shopping_cart/', 200,
+                 data=recipe_ids),
+            Case('delete', '/api/recipes/shopping_cart/', 401,
+                 client='anon', data=recipe_ids),
+            Case('delete', '/api/recipes/shopping_cart/clear/', 204),
+            Case('delete', '/api/recipes/shopping_cart/clear/', 401,
+                 client='anon'),
+            Case('get', '/api/recipes/download_shopping_cart/', 200),
+            Case('get', '/api/recipes/download_shopping_cart/', 401,
+                 client='anon'),
+            Case('get', '/api/sync/', 200, url='/api/sync/?since=0'),
+            Case('get', '/api/sync/', 400, url='/api/sync/?since=x'),
+        ]
+
+    def etag(self, url):
+        response = self.client.get(url)
+        return {'HTTP_IF_NONE_MATCH': response['ETag']}
+
+    def test_every_operation_is_covered(self):
+        covered = {(case.method, case.path) for case in self.cases()}
+        self.assertEqual(self.schema.operations() - covered, set())
+
+    def test_responses_match_schema(self):
+        for case in self.cases():
+            with self.subTest(case=str(case)):
+                self.check(case)
+
+    def check(self, case):
+        # Каждый запрос в своей точке сохранения, чтобы изменения
+        # одного случая не влияли на следующие
+        with transaction.atomic():
+            response = getattr(self, case.client).generic(
+                case.method.upper(),
+                case.url,
+                **self.body(case),
+                **case.headers
+            )
+            transaction.set_rollback(True)
+        self.assertEqual(
+            response.status_code,
+            case.status,
+            getattr(response, 'data', None)
+        )
+        documented = self.schema.response(case.method, case.path,
+                                          case.status)
+        self.assertIsNotNone(documented, 'код ответа не документирован')
+        content = documented.get('content')
+        if not content or not response.has_header('Content-Type'):
+            return
+        content_type = response['Content-Type'].split(';')[0]
+        self.assertIn(content_type, content)
+        if content_type == 'application/json':
+            self.assertEqual(
+                self.schema.errors(content[content_type]['schema'],
+                                   response.json()),
+                []
+            )
+
+    @staticmethod
+    def body(case):
+        if case.data is None:
+            return {}
+        return {
+            'data': json.dumps(case.data),
+            'content_type': 'application/json',
+        }
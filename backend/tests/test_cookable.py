@@ -0,0 +1,46 @@
+from tests import factories
+from tests.base import APITestCase
+
+
+class CookableTest(APITestCase):
+
+    def cookable(self, ingredient):
+        response = self.anon.get('/api/recipes/cookable/',
+                                 {'ingredients': ingredient.id})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_index_follows_change_journal(self):
+        ingredient, = factories.create_ingredients(1)
+        recipe = self.own_recipe
+        self.assertEqual(self.cookable(ingredient), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/recipes/{recipe.id}/', {
+                'ingredients': [{'id': ingredient.id, 'amount': 1}],
+            }, format='json')
+        self.assertEqual(self.cookable(ingredient), [recipe.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(self.cookable(ingredient), [])
+
+    def missing(self, ingredient):
+        response = self.anon.get('/api/recipes/cookable/',
+                                 {'ingredients': ingredient.id})
+        return {recipe['id']: recipe['missing']
+                for recipe in response.data['results']}
+
+    def test_index_follows_deleted_ingredient(self):
+        kept, deleted = factories.create_ingredients(2)
+        recipe = self.own_recipe
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/recipes/{recipe.id}/', {
+                'ingredients': [{'id': kept.id, 'amount': 1},
+                                {'id': deleted.id, 'amount': 1}],
+            }, format='json')
+        self.assertEqual(self.missing(kept), {recipe.id: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        self.assertEqual(self.missing(kept), {recipe.id: 0})
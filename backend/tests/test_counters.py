@@ -0,0 +1,46 @@
+import time
+from unittest import mock
+
+from django.db import OperationalError
+
+from recipes.counters import CounterBuffer
+from recipes.models import Recipe
+from tests.base import APITestCase
+
+
+class CounterBufferTest(APITestCase):
+
+    def test_failed_flush_keeps_deltas(self):
+        buffer = CounterBuffer(flush_interval=60, flush_size=100)
+        buffer.add(self.recipe.id, 'favorites_count', 2)
+        with mock.patch('recipes.counters.apply_deltas',
+                        side_effect=OperationalError), \
+                self.assertLogs('recipes.counters', 'ERROR'):
+            buffer.flush()
+
+        before = Recipe.objects.get(pk=self.recipe.pk).favorites_count
+        buffer.flush()
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count,
+            before + 2
+        )
+
+    def test_idle_buffer_is_flushed_by_interval(self):
+        buffer = CounterBuffer(flush_interval=0.01, flush_size=100)
+        with mock.patch.object(buffer, 'flush') as flush, \
+                mock.patch('recipes.counters.connections'):
+            buffer.add(self.recipe.id, 'favorites_count', 1)
+            deadline = time.monotonic() + 5
+            while not flush.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertTrue(flush.called)
+
+
+class CascadeDeleteTest(APITestCase):
+
+    def test_deleted_user_is_removed_from_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.user.delete()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+        self.assertEqual(recipe.in_cart_count, 0)
@@ -0,0 +1,37 @@
+from tests import factories
+from tests.base import APITestCase
+
+
+class FacetsTest(APITestCase):
+
+    def test_facets_count_filtered_recipes(self):
+        tag = self.tags[0]
+        response = self.anon.get('/api/recipes/', {
+            'tags': tag.slug, 'facets': 'tags,cooking_time'
+        })
+        self.assertEqual(
+            sum(response.data['facets']['cooking_time'].values()),
+            response.data['count']
+        )
+        self.assertEqual(
+            response.data['facets']['tags'][tag.slug],
+            response.data['count']
+        )
+
+    def test_facets_follow_recipe_changes(self):
+        tag = self.tags[0]
+        params = {'tags': tag.slug, 'facets': 'tags'}
+        before = self.anon.get('/api/recipes/', params).data['facets']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+                'tags': [tag.id],
+                'image': factories.IMAGE_BASE64,
+                'name': 'Новый рецепт',
+                'text': 'Описание',
+                'cooking_time': 5,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        after = self.anon.get('/api/recipes/', params).data['facets']
+        self.assertEqual(after['tags'][tag.slug],
+                         before['tags'][tag.slug] + 1)
@@ -0,0 +1,101 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from tests.base import APITestCase
+from users.models import Subscription, User
+
+
+class IndexUsageTest(APITestCase):
+    """Основные выборки используют свои индексы.
+
+    На маленьких таблицах PostgreSQL предпочитает последовательное
+    чтение, поэтому на время проверки оно запрещается.
+    """
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def prefix_index(self, name):
+        # На SQLite LIKE без учёта регистра использует только NOCASE
+        suffix = 'nocase' if connection.vendor == 'sqlite' else 'upper'
+        return f'{name}_{suffix}_idx'
+
+    @staticmethod
+    def column_index(model, column):
+        """Имя индекса, который Django создал для внешнего ключа."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return next(
+            name for name, info in constraints.items()
+            if info['index'] and info['columns'] == [column]
+        )
+
+    def test_recipe_list(self):
+        self.assertUsesIndex(Recipe.objects.all()[:10], 'recipe_pub_date_idx')
+
+    def test_author_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(author=self.author)[:10],
+            'recipe_author_date_idx'
+        )
+
+    def test_popular_recipes(self):
+        self.assertUsesIndex(
+            Recipe.objects.order_by(
+                '-favorites_count', '-in_cart_count', '-pub_date'
+            )[:10],
+            'recipe_popular_idx'
+        )
+
+    def test_ingredient_prefix_search(self):
+        self.assertUsesIndex(
+            Ingredient.objects.filter(name__istartswith='ИНГ'),
+            self.prefix_index('ingredient_name')
+        )
+
+    def test_username_prefix_search(self):
+        self.assertUsesIndex(
+            User.objects.filter(username__istartswith='USER'),
+            self.prefix_index('user_username')
+        )
+
+    def test_name_prefix_search(self):
+        for field in ('first_name', 'last_name'):
+            with self.subTest(field=field):
+                self.assertUsesIndex(
+                    User.objects.filter(**{f'{field}__istartswith': 'И'}),
+                    self.prefix_index(f'user_{field}')
+                )
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm')
+    def test_ingredient_substring_search(self):
+        self.assertUsesIndex(
+            Ingredient.objects.filter(name__icontains='ИНГ'),
+            'ingredient_upper_trgm_idx'
+        )
+
+    def test_list_rows_by_recipe(self):
+        # Пересчёт счётчиков избранного и списка покупок
+        for model in (Favorite, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(
+                    model.objects.filter(recipe=self.recipe),
+                    self.column_index(model, 'recipe_id')
+                )
+
+    def test_followers_of_author(self):
+        self.assertUsesIndex(
+            Subscription.objects.filter(author=self.author),
+            self.column_index(Subscription, 'author_id')
+        )
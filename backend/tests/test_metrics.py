@@ -0,0 +1,86 @@
+import os
+import tempfile
+
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+
+from foodgram import metrics
+from recipes.models import OutboxMessage
+
+
+class MetricsFilesTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_ENABLED=True,
+                                     METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.directory = directory.name
+
+    def write_process(self, pid, amount):
+        metrics._write(metrics.process_file(pid), {
+            metrics.outbox_messages.name: [[['test', 'done'], amount]],
+        })
+
+    def exited_total(self):
+        return metrics.collect()[metrics.outbox_messages.name].get(
+            ('test', 'done'), 0
+        )
+
+    def test_exited_processes_are_merged_into_one_file(self):
+        before = self.exited_total()
+        for pid, amount in ((1001, 2), (1002, 3)):
+            self.write_process(pid, amount)
+            metrics.merge_exited(pid)
+
+        self.assertEqual(os.listdir(self.directory),
+                         [metrics.EXITED_FILE])
+        self.assertEqual(self.exited_total(), before + 5)
+
+    def test_metrics_require_token(self):
+        request = RequestFactory().get('/metrics')
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(metrics.metrics_view(request).status_code, 403)
+        with self.settings(METRICS_TOKEN='secret'):
+            request.META['HTTP_AUTHORIZATION'] = 'Bearer wrong'
+            self.assertEqual(metrics.metrics_view(request).status_code, 403)
+            request.META['HTTP_AUTHORIZATION'] = 'Bearer secret'
+            self.assertEqual(metrics.metrics_view(request).status_code, 200)
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_FLUSH_INTERVAL=3600)
+class MethodLabelTest(SimpleTestCase):
+
+    def requests_by_method(self):
+        return {
+            key[1]: value
+            for key, value in metrics.registry.values[
+                metrics.http_requests.name
+            ].items()
+            if key[0] == 'unresolved'
+        }
+
+    def test_unknown_methods_share_one_label(self):
+        middleware = metrics.MetricsMiddleware(lambda request: HttpResponse())
+        before = self.requests_by_method()
+        for method in ('PROPFIND', 'X-CUSTOM', 'GET'):
+            middleware(RequestFactory().generic(method, '/unknown/'))
+        after = self.requests_by_method()
+        self.assertEqual(set(after), set(before) | {'other', 'GET'})
+        self.assertEqual(after['other'] - before.get('other', 0), 2)
+
+
+class OutboxGaugeTest(TestCase):
+
+    def test_pending_messages_are_reported_on_scrape(self):
+        OutboxMessage.objects.create(topic='recipe.updated',
+                                     payload={'recipe_id': 1})
+        lines = metrics.render().splitlines()
+        self.assertIn('foodgram_outbox_pending_messages 1', lines)
+        self.assertTrue(any(
+            line.startswith('foodgram_outbox_oldest_pending_seconds ')
+            for line in lines
+        ))
@@ -0,0 +1,23 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from foodgram.middleware import CsrfViewMiddleware
+
+
+def view(request):
+    return HttpResponse()
+
+
+class PathScopedMiddlewareTest(SimpleTestCase):
+
+    def process_view(self, path):
+        request = RequestFactory().post(path)
+        middleware = CsrfViewMiddleware(view)
+        return middleware.process_view(request, view, (), {})
+
+    def test_csrf_is_skipped_for_api(self):
+        self.assertIsNone(self.process_view('/api/recipes/'))
+
+    def test_csrf_is_checked_for_admin(self):
+        response = self.process_view('/admin/login/')
+        self.assertEqual(response.status_code, 403)
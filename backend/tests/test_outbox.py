@@ -0,0 +1,19 @@
+import io
+import signal
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class RunWorkerTest(TestCase):
+
+    def setUp(self):
+        # run_worker ставит свои обработчики SIGINT и SIGTERM
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+    def test_warns_without_outbox(self):
+        with self.assertLogs('recipes.management.commands.run_worker',
+                             'WARNING'):
+            call_command('run_worker', once=True, threads=1,
+                         stdout=io.StringIO())
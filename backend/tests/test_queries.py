@@ -0,0 +1,163 @@
+import json
+import statistics
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import tag
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Change
+from recipes.signals import record_changes
+from recipes.sync import current_token, sequence_changes
+from tests.base import APITestCase
+
+LATENCY_RUNS = 5
+
+
+class QueryBudgetTest(APITestCase):
+    """Число запросов к БД и время ответа эндпоинтов.
+
+    Числа запросов точные: лишний запрос после изменения сериализатора
+    или выборки — повод обновить число здесь осознанно. Для списков
+    число запросов не должно зависеть от размера страницы, для пакетных
+    операций — от количества id. Время ответа зависит от машины и
+    нагрузки на неё, поэтому проверяется только с LATENCY_CHECKS.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        record_changes(
+            Change.RECIPE,
+            [recipe.id for recipe in cls.recipes[:-1]]
+        )
+        sequence_changes()
+
+    def budgets(self):
+        """(метод, url, клиент, данные, запросов к БД, бюджет в мс)."""
+        recipe = f'/api/recipes/{self.recipe.id}/'
+        fresh = f'/api/recipes/{self.recipes[10].id}/'
+        ingredient_ids = ','.join(
+            str(ingredient.id) for ingredient in self.ingredients[:5]
+        )
+        return [
+            ('get', '/api/users/', 'anon', None, 2, 50),
+            ('get', '/api/users/', 'client', None, 3, 50),
+            ('get', f'/api/users/{self.author.id}/', 'client', None, 2, 30),
+            ('get', '/api/users/me/', 'client', None, 2, 30),
+            ('get', '/api/users/subscriptions/', 'client', None, 7, 50),
+            ('get', '/api/tags/', 'anon', None, 1, 30),
+            ('get', f'/api/tags/{self.tags[0].id}/', 'anon', None, 1, 30),
+            ('get', '/api/ingredients/?name=ингр', 'anon', None, 1, 30),
+            ('get', f'/api/ingredients/{self.ingredients[0].id}/', 'anon',
+             None, 1, 30),
+            ('get', '/api/recipes/', 'anon', None, 4, 50),
+            ('get', '/api/recipes/', 'client', None, 5, 50),
+            ('get', f'/api/recipes/?tags={self.tags[0].slug}'
+                    f'&tags={self.tags[1].slug}', 'anon', None, 4, 50),
+            ('get', '/api/recipes/?facets=tags,cooking_time', 'anon', None,
+             5, 80),
+            ('get', recipe, 'client', None, 5, 30),
+            ('get', f'{recipe}similar/', 'anon', None, 4, 30),
+            ('get', '/api/recipes/feed/', 'client', None, 6, 50),
+            ('get', f'/api/recipes/cookable/?ingredients={ingredient_ids}',
+             'anon', None, 3, 50),
+            ('get', '/api/recipes/download_shopping_cart/', 'client', None,
+             2, 50),
+            ('get', '/api/sync/?since=0', 'client', None, 6, 50),
+            ('post', f'{fresh}favorite/', 'client', None, 10, 50),
+            ('delete', f'{recipe}favorite/', 'client', None, 7, 50),
+            ('post', '/api/recipes/favorite/', 'client',
+             {'recipes': [item.id for item in self.recipes[3:12]]},
+             10, 50),
+            ('post', f'/api/users/{self.stranger.id}/subscribe/', 'client',
+             None, 15, 80),
+            ('post', '/api/users/subscribe/', 'client',
+             {'authors': [self.stranger.id]}, 12, 80),
+        ]
+
+    def request(self, method, url, client, data):
+        kwargs = {}
+        if data is not None:
+            kwargs = {'data': json.dumps(data),
+                      'content_type': 'application/json'}
+        return getattr(self, client).generic(method.upper(), url, **kwargs)
+
+    def measure(self, method, url, client, data):
+        """Ответ на холодный кэш и запросы к БД, которые он сделал."""
+        cache.clear()
+        sid = connection.savepoint()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request(method, url, client, data)
+        connection.savepoint_rollback(sid)
+        self.assertLess(response.status_code, 300, getattr(
+            response, 'data', None
+        ))
+        return response, [query['sql'] for query in queries]
+
+    def test_query_count(self):
+        for method, url, client, data, expected, budget in self.budgets():
+            with self.subTest(f'{method.upper()} {url} ({client})'):
+                response, queries = self.measure(method, url, client, data)
+                self.assertEqual(len(queries), expected, '\n'.join(queries))
+
+    @tag('latency')
+    @skipUnless(settings.LATENCY_CHECKS, 'включается LATENCY_CHECKS=True')
+    def test_latency(self):
+        factor = settings.LATENCY_BUDGET_FACTOR
+        for method, url, client, data, expected, budget in self.budgets():
+            with self.subTest(f'{method.upper()} {url} ({client})'):
+                timings = []
+                for _ in range(LATENCY_RUNS):
+                    start = time.perf_counter()
+                    self.measure(method, url, client, data)
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.assertLessEqual(
+                    statistics.median(timings),
+                    budget * factor,
+                    f'медиана {statistics.median(timings):.1f} мс'
+                )
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for url, client in (
+            ('/api/users/', 'client'),
+            ('/api/users/subscriptions/', 'client'),
+            ('/api/recipes/', 'anon'),
+            ('/api/recipes/', 'client'),
+            ('/api/recipes/feed/', 'client'),
+        ):
+            with self.subTest(f'{url} ({client})'):
+                small = self.measure('get', f'{url}?limit=1', client, None)
+                large = self.measure('get', f'{url}?limit=20', client, None)
+                self.assertEqual(len(small[1]), len(large[1]))
+
+    def test_sync_queries_do_not_depend_on_changes(self):
+        token = current_token()
+        record_changes(Change.RECIPE, [self.recipe.id])
+        sequence_changes()
+        self.assertEqual(
+            len(self.measure('get', f'/api/sync/?since={token}', 'client',
+                             None)[1]),
+            len(self.measure('get', '/api/sync/?since=0', 'client',
+                             None)[1])
+        )
+
+    def test_batch_queries_do_not_depend_on_size(self):
+        # В избранном и списке покупок user первые рецепты, добавляются
+        # отсутствующие, удаляются имеющиеся
+        batches = {
+            'post': ([self.recipes[10]], self.recipes[5:]),
+            'delete': ([self.recipes[0]], self.recipes),
+        }
+        for url in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/'):
+            for method, (small, large) in batches.items():
+                with self.subTest(f'{method.upper()} {url}'):
+                    self.assertEqual(*(
+                        len(self.measure(method, url, 'client', {
+                            'recipes': [recipe.id for recipe in recipes]
+                        })[1])
+                        for recipes in (small, large)
+                    ))
@@ -0,0 +1,186 @@
+from django.test import override_settings
+
+from api.views import create_new
+from recipes import outbox
+from recipes.models import (
+    Favorite,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart
+)
+from tests import factories
+from tests.base import APITestCase
+
+
+class RecipeFilterTest(APITestCase):
+
+    def ids(self, url, client=None):
+        response = (client or self.anon).get(url)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_user_lists(self):
+        self.assertEqual(
+            set(self.ids('/api/recipes/?is_favorited=1&limit=100',
+                         self.client)),
+            {recipe.id for recipe in self.recipes[:5]}
+        )
+        self.assertEqual(
+            set(self.ids('/api/recipes/?is_in_shopping_cart=1&limit=100',
+                         self.client)),
+            {recipe.id for recipe in self.recipes[:3]}
+        )
+
+    def test_marks_of_current_user(self):
+        response = self.client.get('/api/recipes/', {'limit': 100})
+        for recipe in response.data['results']:
+            favorited = recipe['id'] in {item.id for item in self.recipes[:5]}
+            self.assertEqual(recipe['is_favorited'], favorited)
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] in (self.author.id,
+                                           self.other_author.id)
+            )
+
+
+class RecipeWriteTest(APITestCase):
+
+    def data(self, **changes):
+        return {
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 10}],
+            'tags': [self.tags[0].id],
+            'image': factories.IMAGE_BASE64,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+            **changes,
+        }
+
+    def test_create(self):
+        response = self.client.post('/api/recipes/', self.data(),
+                                    format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(recipe.author, self.user)
+        self.assertEqual(list(recipe.tags.all()), [self.tags[0]])
+        self.assertEqual(recipe.ingredients.get(), self.ingredients[0])
+
+    def test_cooking_time_limits(self):
+        for cooking_time in (0, 5001):
+            with self.subTest(cooking_time=cooking_time):
+                response = self.client.post(
+                    '/api/recipes/',
+                    self.data(cooking_time=cooking_time),
+                    format='json'
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cooking_time', response.data)
+
+    def test_partial_update_keeps_other_fields(self):
+        recipe = self.own_recipe
+        tags = set(recipe.tags.all())
+        ingredients = set(IngredientInRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient', 'amount'))
+        response = self.client.patch(f'/api/recipes/{recipe.id}/',
+                                     {'name': 'Другое название'},
+                                     format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Другое название')
+        self.assertEqual(set(recipe.tags.all()), tags)
+        self.assertEqual(set(IngredientInRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient', 'amount')), ingredients)
+
+    def test_update_replaces_tags_and_ingredients(self):
+        recipe = self.own_recipe
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            self.data(tags=[self.tags[2].id]),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(list(recipe.tags.all()), [self.tags[2]])
+        self.assertEqual(recipe.ingredients.get(), self.ingredients[0])
+
+    def test_only_author_can_change_recipe(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.client.patch(url, {'name': 'Чужой'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 403)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.author, self.author)
+
+
+class UserListsTest(APITestCase):
+
+    def test_counters_follow_lists(self):
+        recipe = self.recipes[10]
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.client_for(self.stranger).post(
+            f'/api/recipes/{recipe.id}/favorite/'
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 2)
+        self.client.delete(f'/api/recipes/{recipe.id}/favorite/')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+    @override_settings(OUTBOX_ENABLED=True)
+    def test_outbox_counters_are_recounted_from_rows(self):
+        recipe = self.recipes[10]
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        message, = outbox.claim(100)
+        # Повтор после сбоя воркера не удваивает изменение
+        outbox.change_counters(**message.payload)
+        outbox.execute(message)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+    def test_batch_results(self):
+        ids = [self.recipes[0].id, self.recipes[10].id, 10 ** 6]
+        response = self.client.post('/api/recipes/favorite/',
+                                    {'recipes': ids}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': ids[0], 'status': 'exists'},
+            {'id': ids[1], 'status': 'added'},
+            {'id': ids[2], 'status': 'not_found'},
+        ])
+        self.assertTrue(Favorite.objects.filter(
+            user=self.user, recipe_id=ids[1]
+        ).exists())
+
+    def test_rows_created_concurrently_are_not_counted(self):
+        # Строку recipes[0] уже создал параллельный запрос
+        recipes = (self.recipes[0], self.recipes[10])
+        created = create_new(
+            [Favorite(user=self.user, recipe=recipe) for recipe in recipes],
+            key='recipe_id'
+        )
+        self.assertEqual(created, [self.recipes[10].id])
+        self.assertEqual(Favorite.objects.filter(
+            user=self.user, recipe__in=recipes
+        ).count(), 2)
+
+    def test_shopping_list_is_summed_and_scaled(self):
+        ShoppingCart.objects.filter(user=self.user).delete()
+        # В штуках, чтобы сумма не переводилась в другие единицы
+        ingredient = next(item for item in self.ingredients
+                          if item.measurement_unit == 'шт')
+        recipes = factories.create_recipes(
+            [self.author], self.tags, [ingredient], 2,
+            ingredients_per_recipe=1
+        )
+        factories.add_to_list(ShoppingCart, self.user, recipes)
+        self.client.patch(f'/api/recipes/{recipes[0].id}/shopping_cart/',
+                          {'multiplier': '2'}, format='json')
+        amounts = dict(IngredientInRecipe.objects.filter(
+            recipe__in=recipes
+        ).values_list('recipe', 'amount'))
+
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        content = b''.join(response.streaming_content).decode()
+        total = amounts[recipes[0].id] * 2 + amounts[recipes[1].id]
+        self.assertEqual(content, f'{ingredient.name} шт. - {total}\n')
@@ -0,0 +1,48 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management import call_command
+
+from recipes.models import Recipe, RecipeBucket, RecipeSignature
+from tests.base import APITestCase
+
+
+class SimilarTest(APITestCase):
+
+    def test_missing_signature_is_not_written_on_read(self):
+        url = f'/api/recipes/{self.recipe.id}/similar/'
+        expected = self.anon.get(url).data
+        RecipeSignature.objects.filter(recipe=self.recipe).delete()
+        RecipeBucket.objects.filter(recipe=self.recipe).delete()
+
+        response = self.anon.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, expected)
+        self.assertFalse(
+            RecipeSignature.objects.filter(recipe=self.recipe).exists()
+        )
+
+    def test_invalid_limit(self):
+        url = f'/api/recipes/{self.recipe.id}/similar/'
+        for limit in ('0', '-1', 'x'):
+            with self.subTest(limit=limit):
+                response = self.anon.get(url, {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('limit', response.data)
+
+    def test_rebuild_replaces_signatures_by_chunks(self):
+        RecipeSignature.objects.filter(recipe=self.recipe).delete()
+        RecipeBucket.objects.create(recipe=self.recipe, bucket=-1)
+
+        # Процессы тестового раннера не могут порождать дочерние
+        with mock.patch(
+            'recipes.management.commands.rebuild_similarity.'
+            'ProcessPoolExecutor',
+            lambda workers, **kwargs: ThreadPoolExecutor(workers)
+        ):
+            call_command('rebuild_similarity', workers=1, chunk_size=5,
+                         stdout=io.StringIO())
+        self.assertEqual(RecipeSignature.objects.count(),
+                         Recipe.objects.count())
+        self.assertFalse(RecipeBucket.objects.filter(bucket=-1).exists())
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from foodgram import slow_queries
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+class QueryTimerTest(SimpleTestCase):
+
+    def setUp(self):
+        self.log = slow_queries.SlowQueryLog()
+        self.addCleanup(self.log.entries.clear)
+        patcher = mock.patch.object(slow_queries, 'slow_query_log', self.log)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        request = RequestFactory().get('/api/recipes/')
+        request.resolver_match = None
+        self.timer = slow_queries.QueryTimer(request)
+
+    def run_query(self, execute, sql='SELECT 1'):
+        return self.timer(execute, sql, (), False,
+                          {'connection': connection})
+
+    def test_failed_query_is_not_recorded(self):
+        execute = mock.Mock(side_effect=OperationalError)
+        with self.assertRaises(OperationalError):
+            self.run_query(execute)
+        self.assertEqual(self.log.entries, {})
+
+    def test_recording_error_does_not_break_query(self):
+        with mock.patch.object(self.log, 'add', side_effect=ValueError), \
+                self.assertLogs('foodgram.slow_queries', 'ERROR'):
+            result = self.run_query(mock.Mock(return_value='rows'))
+        self.assertEqual(result, 'rows')
+
+    @override_settings(SLOW_QUERY_MAX_FINGERPRINTS=1)
+    def test_no_explain_over_fingerprint_limit(self):
+        execute = mock.Mock(return_value=None)
+        with mock.patch.object(self.timer, 'explain',
+                               return_value='plan') as explain:
+            self.run_query(execute, 'SELECT 1')
+            self.run_query(execute, 'SELECT name FROM recipes_tag')
+        explain.assert_called_once()
+        self.assertEqual(len(self.log.entries), 1)
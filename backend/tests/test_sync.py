@@ -0,0 +1,42 @@
+from recipes.models import Change
+from recipes.signals import record_changes
+from recipes.sync import sequence_changes
+from tests.base import APITestCase
+
+
+class SyncTest(APITestCase):
+
+    def sync(self, since):
+        response = self.client.get('/api/sync/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_list_changes_are_delivered(self):
+        token = self.client.get('/api/sync/').data['token']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipes[10].id}/favorite/')
+        data = self.sync(token)
+        self.assertFalse(data['reset'])
+        self.assertEqual(data['favorite']['added'], [self.recipes[10].id])
+        self.assertEqual(self.sync(data['token'])['favorite']['added'], [])
+
+    def test_late_commit_is_not_skipped(self):
+        # Транзакция, начатая раньше, получила меньший id, но
+        # зафиксирована после того, как клиент получил курсор
+        record_changes(Change.RECIPE, [self.recipes[1].id])
+        sequence_changes()
+        token = self.sync(0)['token']
+        late_id = Change.objects.order_by('id').first().id - 1
+        Change.objects.create(id=late_id, kind=Change.RECIPE,
+                              object_id=self.recipes[2].id)
+        sequence_changes()
+
+        data = self.sync(token)
+        self.assertFalse(data['reset'])
+        self.assertEqual(
+            [recipe['id'] for recipe in data['recipes']['updated']],
+            [self.recipes[2].id]
+        )
+
+    def test_unknown_token_resets(self):
+        self.assertTrue(self.sync(10 ** 6)['reset'])
@@ -0,0 +1,74 @@
+from django.db import IntegrityError
+
+from recipes.models import Recipe, TagInRecipe
+from tests import factories
+from tests.base import APITestCase
+
+
+class TagFilterTest(APITestCase):
+
+    def ids(self, url):
+        response = self.anon.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_recipe_with_several_matching_tags_is_listed_once(self):
+        first, second = self.tags[:2]
+        both = set(TagInRecipe.objects.filter(
+            tag=first
+        ).values_list('recipe', flat=True)) & set(TagInRecipe.objects.filter(
+            tag=second
+        ).values_list('recipe', flat=True))
+        self.assertTrue(both)
+        expected = set(TagInRecipe.objects.filter(
+            tag__in=(first, second)
+        ).values_list('recipe', flat=True))
+
+        response = self.anon.get('/api/recipes/', {
+            'tags': [first.slug, second.slug], 'limit': 100
+        })
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), expected)
+        self.assertEqual(response.data['count'], len(expected))
+
+    def test_all_tags_mode(self):
+        first, second = self.tags[:2]
+        ids = self.ids(f'/api/recipes/?tags={first.slug}&tags={second.slug}'
+                       f'&tags_mode=all&limit=100')
+        for recipe in Recipe.objects.filter(pk__in=ids):
+            self.assertTrue({first, second} <= set(recipe.tags.all()))
+
+
+class TagInRecipeTest(APITestCase):
+
+    def test_duplicate_tag_is_rejected(self):
+        tag = self.recipe.tags.first()
+        with self.assertRaises(IntegrityError):
+            TagInRecipe.objects.create(recipe=self.recipe, tag=tag)
+
+    def test_tags_are_written_through_tag_in_recipe(self):
+        first, second = self.tags[:2]
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 10}],
+            'tags': [first.id, first.id, second.id],
+            'image': factories.IMAGE_BASE64,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe_id = response.data['id']
+        self.assertEqual(set(TagInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('tag', flat=True)), {first.id, second.id})
+
+        response = self.client.patch(f'/api/recipes/{recipe_id}/',
+                                     {'tags': [second.id]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            list(TagInRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('tag', flat=True)),
+            [second.id]
+        )
@@ -0,0 +1,23 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api import throttling
+
+
+@override_settings(RATE_LIMIT_CACHE='default')
+class CacheBucketStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(setattr, throttling, '_store', None)
+        throttling._store = None
+
+    def test_processes_share_buckets(self):
+        self.assertIsInstance(throttling.get_store(),
+                              throttling.CacheBucketStore)
+        # Корзина в общем кэше: второй процесс видит токены первого
+        first = throttling.CacheBucketStore('default')
+        second = throttling.CacheBucketStore('default')
+        self.assertEqual(first.take('throttle:test:1', 2, 1 / 60), 0)
+        self.assertEqual(second.take('throttle:test:1', 2, 1 / 60), 0)
+        self.assertGreater(first.take('throttle:test:1', 2, 1 / 60), 0)
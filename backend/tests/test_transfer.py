@@ -0,0 +1,61 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from recipes import transfer
+from recipes.models import Change, Favorite, Recipe
+from tests.base import APITestCase
+
+
+class TransferTest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'backup.jsonl')
+        call_command('export_data', self.path, stdout=StringIO())
+
+    def import_data(self):
+        # База тестов не пуста: загрузка как продолжение с начала файла
+        transfer.write_checkpoint(f'{self.path}.checkpoint', {
+            'offset': 0, 'rows': 0, 'skipped': 0,
+        })
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_data', self.path, resume=True,
+                         stdout=stdout)
+        return stdout.getvalue()
+
+    def test_non_empty_database_is_refused(self):
+        with self.assertRaisesMessage(CommandError, 'База не пуста'):
+            call_command('import_data', self.path, stdout=StringIO())
+
+    def test_existing_rows_are_reported_as_skipped(self):
+        with open(self.path, encoding='UTF-8') as file:
+            rows = sum(1 for line in file)
+        self.assertIn(f'Загружено строк: 0, пропущено: {rows}',
+                      self.import_data())
+
+    def test_imported_rows_are_journaled(self):
+        favorite = Favorite.objects.filter(user=self.user).first()
+        Favorite.objects.filter(pk=favorite.pk).delete()
+        Change.objects.all().delete()
+
+        self.assertIn('Загружено строк: 1,', self.import_data())
+        change = Change.objects.get()
+        self.assertEqual(
+            (change.kind, change.object_id, change.user_id),
+            (Change.FAVORITE, favorite.recipe_id, self.user.id)
+        )
+        self.assertIsNotNone(change.seq)
+
+    def test_counters_are_recounted(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=99)
+        self.import_data()
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count,
+            Favorite.objects.filter(recipe=self.recipe).count()
+        )
@@ -0,0 +1,142 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from recipes import feed, outbox
+from recipes.models import FeedItem, OutboxMessage, Recipe
+from tests import factories
+from tests.base import APITestCase
+from users.models import Subscription
+
+
+class SubscribeTest(APITestCase):
+
+    def test_subscribe(self):
+        response = self.client.post(
+            f'/api/users/{self.stranger.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(response.data['is_subscribed'])
+        self.assertTrue(Subscription.objects.filter(
+            user=self.user, author=self.stranger
+        ).exists())
+
+    def test_repeated_subscription_is_rejected(self):
+        response = self.client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Subscription.objects.filter(
+            user=self.user, author=self.author
+        ).count(), 1)
+
+    def test_self_subscription_is_rejected(self):
+        response = self.client.post(f'/api/users/{self.user.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.filter(
+            user=self.user, author=self.user
+        ).exists())
+
+    def test_unsubscribe_without_subscription(self):
+        response = self.client.delete(
+            f'/api/users/{self.stranger.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class SubscriptionsTest(APITestCase):
+
+    def latest(self, author, limit):
+        return list(Recipe.objects.filter(author=author).order_by(
+            '-pub_date'
+        ).values_list('id', flat=True)[:limit])
+
+    def test_recipes_limit_keeps_latest_recipes_of_each_author(self):
+        response = self.client.get('/api/users/subscriptions/',
+                                   {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        authors = {author['id']: author
+                   for author in response.data['results']}
+        self.assertEqual(authors.keys(),
+                         {self.author.id, self.other_author.id})
+        for author in (self.author, self.other_author):
+            self.assertEqual(
+                {recipe['id'] for recipe in authors[author.id]['recipes']},
+                set(self.latest(author, 2))
+            )
+            self.assertEqual(
+                authors[author.id]['recipes_count'],
+                Recipe.objects.filter(author=author).count()
+            )
+
+    def test_invalid_recipes_limit(self):
+        response = self.client.get('/api/users/subscriptions/',
+                                   {'recipes_limit': '-1'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
+
+
+class FeedTest(APITestCase):
+
+    def read_feed(self, limit):
+        ids, url = [], f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_feed_without_duplicates(self):
+        expected = list(Recipe.objects.filter(
+            author__in=(self.author, self.other_author)
+        ).order_by('-pub_date', '-id').values_list('id', flat=True))
+        for limit in (1, 5, 100):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.read_feed(limit), expected)
+
+    def test_invalid_limit(self):
+        for limit in ('0', '-1', 'x'):
+            with self.subTest(limit=limit):
+                response = self.client.get('/api/recipes/feed/',
+                                           {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('limit', response.data)
+
+    def test_unsubscribe_removes_author_from_feed(self):
+        self.client.delete(f'/api/users/{self.author.id}/subscribe/')
+        authors = set(Recipe.objects.filter(
+            pk__in=self.read_feed(100)
+        ).values_list('author', flat=True))
+        self.assertEqual(authors, {self.other_author.id})
+
+    def test_author_leaving_pull_set_is_backfilled(self):
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=1), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertIn(self.author.id, feed.pull_authors())
+        recipe, = factories.create_recipes(
+            [self.author], self.tags, self.ingredients, 1
+        )
+        feed.push(recipe)
+        self.assertFalse(FeedItem.objects.filter(recipe=recipe).exists())
+
+        # Кэш набора истёк, у автора теперь меньше подписчиков, чем порог
+        cache.delete(feed.PULL_AUTHORS_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertNotIn(self.author.id, feed.pull_authors())
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.user, recipe=recipe
+        ).exists())
+        self.assertIn(recipe.id, self.read_feed(100))
+
+    @override_settings(OUTBOX_ENABLED=True)
+    def test_subscription_reaches_feed_through_outbox(self):
+        self.client.post(f'/api/users/{self.stranger.id}/subscribe/')
+        recipe, = factories.create_recipes(
+            [self.stranger], self.tags, self.ingredients, 1
+        )
+        self.assertNotIn(recipe.id, self.read_feed(100))
+
+        messages = outbox.claim(100)
+        self.assertTrue(messages)
+        for message in messages:
+            outbox.execute(message)
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertIn(recipe.id, self.read_feed(100))
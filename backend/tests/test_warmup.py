@@ -0,0 +1,18 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, override_settings
+
+from foodgram.warmup import warm_up
+
+
+class WarmUpTest(SimpleTestCase):
+
+    @override_settings(WARM_CACHES_ON_STARTUP=True)
+    def test_unavailable_database_does_not_stop_start(self):
+        with mock.patch(
+            'django.contrib.contenttypes.models.ContentTypeManager'
+            '.get_for_models',
+            side_effect=OperationalError('could not connect')
+        ), self.assertLogs('foodgram.warmup', 'ERROR'):
+            warm_up()
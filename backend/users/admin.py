@@ -17,8 +17,8 @@ class UserAdmin(BaseUserAdmin):
         'email'
     )
     list_filter = (
-        'first_name',
-        'last_name'
+        'is_staff',
+        'is_active'
     )
 
 
@@ -28,3 +28,16 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'user',
         'author'
     )
+    list_select_related = (
+        'user',
+        'author'
+    )
+    search_fields = (
+        'user__username',
+        'author__username'
+    )
+    autocomplete_fields = (
+        'user',
+        'author'
+    )
+    show_full_result_count = False
@@ -1,8 +1,12 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.contrib.postgres.indexes import OpClass
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Upper
+
+from foodgram.indexes import PostgresOnlyIndex
 
 
 class User(AbstractUser):
@@ -33,6 +37,14 @@ class User(AbstractUser):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('username',)
+        # Поиск пользователей по началу строки (istartswith)
+        indexes = [
+            PostgresOnlyIndex(
+                OpClass(Upper(field), name='text_pattern_ops'),
+                name=f'user_{field}_upper_idx'
+            )
+            for field in ('username', 'first_name', 'last_name')
+        ]
 
     def __str__(self):
         return str(self.username)